@@ -0,0 +1,43 @@
+"""
+Compiled kernels for analyze_pre_file.py.
+
+Numba is optional: without it HAVE_NUMBA is False and callers fall back to
+their NumPy implementation.
+"""
+
+from functools import lru_cache
+
+try:
+    from numba import njit, prange
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+
+if HAVE_NUMBA:
+    @lru_cache(maxsize=8)
+    def make_raw_estimate_kernel(gamma: float, epsilon: float):
+        """
+        Build a raw-estimate kernel specialized for one (gamma, epsilon) pair.
+
+        The kernel sums TouchCount1 * TouchCount2 * probability over cells occupied in
+        both grids in a single fused pass (same formula as cell_probabilities()).
+        gamma and epsilon are closed over, so Numba compiles them in as constants;
+        kernels are reused across file pairs that share the parameters.
+        """
+        half_gamma = 0.5 * gamma
+
+        @njit(parallel=True, fastmath=True)
+        def raw_estimate_kernel(tc1, tc2, a1, a2, v1, v2, cellVolume):
+            acc = 0.0
+            for i in prange(tc1.size):
+                if tc1[i] == 0 or tc2[i] == 0:
+                    continue
+                c = a1[i] + a2[i] + epsilon
+                p = c * c * c / cellVolume * (v1[i] * v2[i]) ** half_gamma
+                if p > 1.0:
+                    p = 1.0
+                acc += float(tc1[i]) * float(tc2[i]) * p
+            return acc
+
+        return raw_estimate_kernel
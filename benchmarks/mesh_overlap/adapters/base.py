@@ -1,12 +1,33 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
 
+import asyncio
+import statistics
 import subprocess
 import sys
 import time
 import selectors
 from pathlib import Path
-from typing import List, Tuple
+from typing import List, Tuple, Union
+
+
+def runtime_stats(runtimes: List[float]) -> Dict[str, float]:
+    """Mean/min/max/population std of a list of run times."""
+    return {
+        "mean": statistics.fmean(runtimes),
+        "min": min(runtimes),
+        "max": max(runtimes),
+        "std": statistics.pstdev(runtimes),
+    }
+
+
+def _prefix_lines(text: str, prefix: Optional[str]) -> str:
+    """Prepend prefix to every line of text (trailing newline preserved)."""
+    if not prefix or not text:
+        return text
+    nl = "\n" if text.endswith("\n") else ""
+    body = text[:-1] if nl else text
+    return f"{prefix} " + body.replace("\n", f"\n{prefix} ") + nl
 
 
 def run_command_streaming(
@@ -15,70 +36,109 @@ def run_command_streaming(
     timeout: Optional[float] = None,
     log_path: Optional[str] = None,
     prefix: Optional[str] = None,
+    stream_to_terminal: bool = True,
+    cmd_str: Optional[str] = None,
 ) -> Tuple[str, str]:
     """Run a command while streaming output to terminal and optionally logging to file.
 
+    With stream_to_terminal=False output is only captured (and logged); without a
+    log_path the child is then simply drained with communicate().
+    cmd_str: the command line as written to the log header; callers that run the
+    same argv repeatedly can join it once and pass it in.
+
     Returns (stdout_text, stderr_text). Raises CalledProcessError/TimeoutExpired on failure.
     """
+    if not stream_to_terminal and not log_path:
+        with subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            close_fds=False,
+        ) as proc:
+            try:
+                stdout, stderr = proc.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                raise
+        stdout_text = stdout.decode("utf-8", "replace")
+        stderr_text = stderr.decode("utf-8", "replace")
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd, output=stdout_text, stderr=stderr_text)
+        return stdout_text, stderr_text
+
     log_fh = None
     if log_path:
         Path(log_path).parent.mkdir(parents=True, exist_ok=True)
-        log_fh = open(log_path, "w", encoding="utf-8")
+        log_fh = open(log_path, "w", encoding="utf-8", buffering=1 << 16)
         log_fh.write("COMMAND:\n")
-        log_fh.write(" ".join(cmd) + "\n\n")
+        log_fh.write((cmd_str if cmd_str is not None else " ".join(cmd)) + "\n\n")
 
-    start = time.time()
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    # Python's own fds are non-inheritable already; skipping the close_fds sweep
+    # lets CPython launch the child via posix_spawn instead of fork+exec.
     proc = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
-        text=True,
-        bufsize=1,
+        bufsize=-1,
+        close_fds=False,
     )
 
-    stdout_parts: List[str] = []
-    stderr_parts: List[str] = []
+    stdout_parts: List[bytes] = []
+    stderr_parts: List[bytes] = []
 
     sel = selectors.DefaultSelector()
     assert proc.stdout is not None
     assert proc.stderr is not None
-    sel.register(proc.stdout, selectors.EVENT_READ, data="stdout")
-    sel.register(proc.stderr, selectors.EVENT_READ, data="stderr")
+    # Drain each pipe in bulk with read1() and split lines here, so a burst of
+    # N lines costs one read instead of N readline() calls.
+    sel.register(proc.stdout, selectors.EVENT_READ, data=("stdout", stdout_parts, sys.stdout))
+    sel.register(proc.stderr, selectors.EVENT_READ, data=("stderr", stderr_parts, sys.stderr))
+    pending = {"stdout": b"", "stderr": b""}
+    # Only push output through immediately when someone is watching a terminal;
+    # redirected output and the log file are flushed once the child exits.
+    live = {"stdout": sys.stdout.isatty(), "stderr": sys.stderr.isatty()}
 
     try:
         while sel.get_map():
-            if timeout is not None and (time.time() - start) > timeout:
-                proc.kill()
-                raise subprocess.TimeoutExpired(cmd=cmd, timeout=timeout)
+            wait = 0.1
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    proc.kill()
+                    raise subprocess.TimeoutExpired(cmd=cmd, timeout=timeout)
+                wait = min(wait, remaining)
 
-            for key, _ in sel.select(timeout=0.1):
-                stream_name = key.data
-                line = key.fileobj.readline()
-                if line == "":
+            for key, _ in sel.select(timeout=wait):
+                stream_name, parts, term = key.data
+                chunk = key.fileobj.read1(65536)
+                data = pending[stream_name] + chunk
+                if chunk == b"":
+                    # EOF: emit any unterminated trailing line
+                    pending[stream_name] = b""
                     try:
                         sel.unregister(key.fileobj)
                     except Exception:
                         pass
-                    continue
-
-                if stream_name == "stdout":
-                    out_line = f"{prefix} {line}" if prefix else line
-                    stdout_parts.append(line)
-                    sys.stdout.write(out_line)
-                    sys.stdout.flush()
                 else:
-                    out_line = f"{prefix} {line}" if prefix else line
-                    stderr_parts.append(line)
-                    sys.stderr.write(out_line)
-                    sys.stderr.flush()
+                    cut = data.rfind(b"\n") + 1
+                    pending[stream_name] = data[cut:]
+                    data = data[:cut]
+                if not data:
+                    continue
 
+                parts.append(data)
+                out_text = _prefix_lines(data.decode("utf-8", "replace"), prefix)
+                if stream_to_terminal:
+                    term.write(out_text)
+                    if live[stream_name]:
+                        term.flush()
                 if log_fh is not None:
-                    log_fh.write(out_line)
-                    log_fh.flush()
+                    log_fh.write(out_text)
 
         return_code = proc.wait()
-        stdout_text = "".join(stdout_parts)
-        stderr_text = "".join(stderr_parts)
+        stdout_text = b"".join(stdout_parts).decode("utf-8", "replace")
+        stderr_text = b"".join(stderr_parts).decode("utf-8", "replace")
 
         if return_code != 0:
             raise subprocess.CalledProcessError(return_code, cmd, output=stdout_text, stderr=stderr_text)
@@ -88,13 +148,105 @@ def run_command_streaming(
             sel.close()
         except Exception:
             pass
+        sys.stdout.flush()
+        sys.stderr.flush()
         if log_fh is not None:
-            log_fh.flush()
             log_fh.close()
 
+
+async def _run_command_async(
+    cmd: List[str],
+    semaphore: asyncio.Semaphore,
+    timeout: Optional[float],
+    log_path: Optional[str],
+    prefix: Optional[str],
+    stream_to_terminal: bool,
+) -> Tuple[str, str]:
+    async with semaphore:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            close_fds=False,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise subprocess.TimeoutExpired(cmd=cmd, timeout=timeout)
+
+    stdout_text = stdout.decode("utf-8", "replace")
+    stderr_text = stderr.decode("utf-8", "replace")
+    out_text = _prefix_lines(stdout_text, prefix) + _prefix_lines(stderr_text, prefix)
+    if stream_to_terminal:
+        sys.stdout.write(out_text)
+    if log_path:
+        Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(log_path, "w", encoding="utf-8") as log_fh:
+            log_fh.write("COMMAND:\n")
+            log_fh.write(" ".join(cmd) + "\n\n")
+            log_fh.write(out_text)
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, output=stdout_text, stderr=stderr_text)
+    return stdout_text, stderr_text
+
+
+def run_commands_concurrently(
+    cmds: List[List[str]],
+    *,
+    max_parallel: int,
+    timeout: Optional[float] = None,
+    log_paths: Optional[List[Optional[str]]] = None,
+    prefix: Optional[str] = None,
+    stream_to_terminal: bool = True,
+) -> List[Union[Tuple[str, str], BaseException]]:
+    """Run independent commands with at most max_parallel in flight at once.
+
+    Output of each command is printed (and logged) in one block once it finishes,
+    rather than streamed. Returns one entry per command, in order: either
+    (stdout_text, stderr_text) or the CalledProcessError/TimeoutExpired it raised.
+    """
+    if log_paths is None:
+        log_paths = [None] * len(cmds)
+
+    async def gather_runs():
+        semaphore = asyncio.Semaphore(max_parallel)
+        return await asyncio.gather(
+            *(
+                _run_command_async(cmd, semaphore, timeout, log_path, prefix, stream_to_terminal)
+                for cmd, log_path in zip(cmds, log_paths)
+            ),
+            return_exceptions=True,
+        )
+
+    try:
+        return asyncio.run(gather_runs())
+    finally:
+        sys.stdout.flush()
+
 class OverlapBenchmarkAdapter(ABC):
     def __init__(self, name: str):
         self.name = name
+        # Echo child process output to the terminal while runs execute
+        self.stream_output = True
+        # CPU list (taskset syntax, e.g. "2-7") to pin benchmarked processes to
+        self.bench_cpus: Optional[str] = None
+        # Niceness increment applied to the harness, undone for benchmarked processes
+        self.harness_nice = 0
+
+    def pinned(self, cmd: List[str]) -> List[str]:
+        """Prefix cmd with taskset when bench_cpus is set, and with nice when the
+        harness lowered its own priority (children would inherit both otherwise).
+
+        Wrappers (rather than preexec_fn) keep the launch on posix_spawn.
+        """
+        if self.harness_nice:
+            cmd = ["nice", "-n", str(-self.harness_nice)] + cmd
+        if self.bench_cpus:
+            cmd = ["taskset", "-c", self.bench_cpus] + cmd
+        return cmd
 
     @abstractmethod
     def run_overlap(
@@ -1,10 +1,11 @@
 import subprocess
 import time
 import re
-import numpy as np
 from typing import Dict, Any, Optional
 from pathlib import Path
-from .base import OverlapBenchmarkAdapter, run_command_streaming
+from .base import OverlapBenchmarkAdapter, run_command_streaming, runtime_stats
+
+_QUERY_TIME_RE = re.compile(r"Query Time:.*?\(([\d.]+) ms\)")
 
 class CGALAdapter(OverlapBenchmarkAdapter):
     def __init__(self, cgal_dir: str, preprocessed_dir: str = "preprocessed", threads: int = None):
@@ -38,6 +39,7 @@ class CGALAdapter(OverlapBenchmarkAdapter):
         cmd = [str(self.executable), str(p1), str(p2)]
         if self.threads:
             cmd.append(str(self.threads))
+        cmd = self.pinned(cmd)
         
         print(f"[{self.name}] Running benchmark on {p1.name} and {p2.name} using {self.threads or 'all available'} threads...")
 
@@ -46,6 +48,8 @@ class CGALAdapter(OverlapBenchmarkAdapter):
             adapter_log_dir = Path(log_dir) / self.name
             adapter_log_dir.mkdir(parents=True, exist_ok=True)
 
+        prefix = f"[{self.name}]"
+        cmd_str = " ".join(cmd)
         for run_idx in range(num_runs):
             try:
                 log_path = None
@@ -55,14 +59,15 @@ class CGALAdapter(OverlapBenchmarkAdapter):
                     cmd,
                     timeout=timeout,
                     log_path=log_path,
-                    prefix=f"[{self.name}]",
+                    prefix=prefix,
+                    stream_to_terminal=self.stream_output,
+                    cmd_str=cmd_str,
                 )
-                output = stdout_text + stderr_text
-                match = re.search(r"Query Time:.*?\(([\d.]+) ms\)", output)
+                match = _QUERY_TIME_RE.search(stdout_text) or _QUERY_TIME_RE.search(stderr_text)
                 if match:
                     runtimes.append(float(match.group(1)))
                 else:
-                    print(f"[{self.name}] Error: Could not find 'Query Time' in output. Result:\n{output}")
+                    print(f"[{self.name}] Error: Could not find 'Query Time' in output. Result:\n{stdout_text + stderr_text}")
                     return {"error": "Timing string not found in output"}
             except subprocess.TimeoutExpired:
                 print(f"[{self.name}] Timeout reached ({timeout}s)")
@@ -74,9 +79,6 @@ class CGALAdapter(OverlapBenchmarkAdapter):
             return {"error": "No timing results collected"}
 
         return {
-            "mean": np.mean(runtimes),
-            "min": np.min(runtimes),
-            "max": np.max(runtimes),
-            "std": np.std(runtimes),
+            **runtime_stats(runtimes),
             "raw_times": runtimes
         }
@@ -1,10 +1,34 @@
+import os
 import subprocess
 import time
 import json
-import numpy as np
-from typing import Dict, Any, Optional, List
+import statistics
+import re
+from typing import Dict, Any, Optional, List, Iterable, Tuple
 from pathlib import Path
-from .base import OverlapBenchmarkAdapter, run_command_streaming
+from .base import OverlapBenchmarkAdapter, run_command_streaming, runtime_stats, run_commands_concurrently
+
+# Summary lines printed by the raytracer binaries. "Hash Table Query found N unique ..."
+# is printed in estimated mode, "Final Estimated Pairs: N" in estimate-only mode.
+_SUMMARY_RE = re.compile(
+    r"(Mesh1 objects|Mesh2 objects|Unique object pairs|Final Estimated Pairs):\s*(\d+)"
+    r"|Hash Table Query found\s*(\d+)\s*unique"
+)
+_SUMMARY_FIELDS = {
+    "Mesh1 objects": "num_obj1",
+    "Mesh2 objects": "num_obj2",
+    "Unique object pairs": "num_intersections",
+    "Final Estimated Pairs": "num_intersections",
+}
+# Timing phases summed into the query time, per mode. Keys in the JSON have the
+# run number appended ('1' for the single measured run).
+_EXPECTED_PHASES = {
+    "exact": ("query_", "gpu deduplication_", "download results_"),
+    # For estimated mode, include selectivity estimation in query time
+    "estimated": ("selectivity estimation_", "execute hash query_", "download results_"),
+    "estimate_only": ("selectivity estimation_",),
+}
+
 
 class RaytracerAdapter(OverlapBenchmarkAdapter):
     def __init__(
@@ -15,47 +39,90 @@ class RaytracerAdapter(OverlapBenchmarkAdapter):
         timings_dir: str = "timings",
         grid_resolution: int = 10,
         warmup_runs: int = 10,
+        parallel_runs: int = 1,
     ):
         """
         mode: 'exact' or 'estimated'
         grid_resolution: resolution for grid generation (default: 10)
+        parallel_runs: number of benchmark repetitions allowed in flight at once
+            (default: 1; raise only when runs do not contend for the GPU, e.g. estimate_only)
         """
         super().__init__(f"Raytracer_{mode}")
         self.rayspace_dir = Path(rayspace_dir)
-        self.mode = mode
         self.preprocessed_dir = Path(preprocessed_dir)
         self.timings_dir = Path(timings_dir)
         self.grid_resolution = grid_resolution
         self.warmup_runs = warmup_runs
+        self.parallel_runs = parallel_runs
         # Ensure directories exist
-        self.timings_dir.mkdir(parents=True, exist_ok=True)
-        self.preprocessed_dir.mkdir(parents=True, exist_ok=True)
+        self._known_dirs = set()
+        self._preprocessed = set()
+        self._ensure_dir(self.timings_dir)
+        self._ensure_dir(self.preprocessed_dir)
+        
+        self.set_mode(mode)
+
+        # Preprocess binary is in preprocess/build/bin
+        self.preprocess_exec = self.rayspace_dir / "preprocess" / "build" / "bin" / "preprocess_dataset"
         
+    def set_mode(self, mode: str):
+        """Switch the query mode, keeping directories and the preprocessed-file cache.
+
+        Lets one adapter run exact and estimated queries over the same preprocessed datasets.
+        """
         # Determine executable based on mode
         # Binaries are in query/build/bin
         query_bin_dir = self.rayspace_dir / "query" / "build" / "bin"
-        if self.mode == "exact":
+        if mode == "exact":
             self.executable = query_bin_dir / "raytracer_mesh_overlap"
-        elif self.mode in ("estimated", "estimate_only"):
+        elif mode in ("estimated", "estimate_only"):
             self.executable = query_bin_dir / "raytracer_overlap_estimated"
         else:
-            raise ValueError(f"Unknown mode: {self.mode}")
+            raise ValueError(f"Unknown mode: {mode}")
+
+        self.mode = mode
+        self.name = f"Raytracer_{mode}"
+        self._expected_phases = [(phase, f"{phase}1") for phase in _EXPECTED_PHASES[mode]]
+        # Per-process stem for the timing JSON each run writes; run_idx makes it unique
+        # within a call, so concurrent runs never collide on a whole-second timestamp.
+        self._timing_stem = f"timing_{mode}_{os.getpid()}_"
+
+    def _ensure_dir(self, path: Path):
+        """mkdir -p, once per directory for the lifetime of this adapter."""
+        if path not in self._known_dirs:
+            path.mkdir(parents=True, exist_ok=True)
+            self._known_dirs.add(path)
+
+    def _pre_path(self, file_path: str) -> Path:
+        return self.preprocessed_dir / Path(file_path).with_suffix('.pre').name
+
+    def _pre_exists(self, pre_file: Path) -> bool:
+        """pre_file.exists(), remembering hits so later checks skip the stat().
+
+        Outputs are only ever added (never removed) during a run, so cached hits stay valid.
+        """
+        if pre_file in self._preprocessed:
+            return True
+        if pre_file.exists():
+            self._preprocessed.add(pre_file)
+            return True
+        return False
 
-        # Preprocess binary is in preprocess/build/bin
-        self.preprocess_exec = self.rayspace_dir / "preprocess" / "build" / "bin" / "preprocess_dataset"
-        
     def check_preprocessed(self, file_path: str) -> bool:
         """Check if .pre file exists for the given .dt or .obj file in preprocessed dir."""
-        input_path = Path(file_path)
-        pre_file = self.preprocessed_dir / input_path.with_suffix('.pre').name
-        return pre_file.exists()
+        return self._pre_exists(self._pre_path(file_path))
 
     def preprocess(self, file_path: str):
         """Run the RaySpace3D preprocessing tool including grid generation."""
         self.preprocess_from_source(file_path, file_path)
     
-    def preprocess_from_source(self, source_file: str, dt_file: str, log_dir: Optional[str] = None):
-        """Run preprocessing using a source file (.obj) but naming outputs based on dt_file."""
+    def _preprocess_job(
+        self,
+        source_file: str,
+        dt_file: str,
+        log_dir: Optional[str],
+    ) -> Tuple[List[str], Optional[Path]]:
+        """Build the preprocessing command for one dataset and its log path (if logging)."""
         source_path = Path(source_file)
         dt_path = Path(dt_file)
         
@@ -78,14 +145,82 @@ class RaytracerAdapter(OverlapBenchmarkAdapter):
         ]
         
         print(f"[{self.name}] Preprocessing {source_path.name} (output: {dt_path.name}) with grid (resolution={self.grid_resolution})...")
+        log_path = None
         if log_dir:
             adapter_log_dir = Path(log_dir) / self.name
-            adapter_log_dir.mkdir(parents=True, exist_ok=True)
+            self._ensure_dir(adapter_log_dir)
             log_path = adapter_log_dir / f"preprocess_{dt_path.stem}_{int(time.time())}.log"
-            run_command_streaming(cmd, timeout=None, log_path=str(log_path), prefix=f"[{self.name}]")
+        return cmd, log_path
+
+    def preprocess_from_source(
+        self,
+        source_file: str,
+        dt_file: str,
+        log_dir: Optional[str] = None,
+        stream: bool = True,
+    ):
+        """Run preprocessing using a source file (.obj) but naming outputs based on dt_file.
+
+        stream: echo preprocessor output to the terminal. When False and log_dir is
+            given, the child writes straight into the log file instead of going through Python.
+        """
+        cmd, log_path = self._preprocess_job(source_file, dt_file, log_dir)
+        if log_path is not None:
+            if not stream:
+                with open(log_path, "w", encoding="utf-8") as log_fh:
+                    log_fh.write("COMMAND:\n")
+                    log_fh.write(" ".join(cmd) + "\n\n")
+                    log_fh.flush()
+                    subprocess.run(cmd, stdout=log_fh, stderr=subprocess.STDOUT, check=True, close_fds=False)
+            else:
+                run_command_streaming(cmd, timeout=None, log_path=str(log_path), prefix=f"[{self.name}]")
         else:
             # Stream to terminal without logging
             run_command_streaming(cmd, timeout=None, log_path=None, prefix=f"[{self.name}]")
+        # The preprocessor succeeded (failures raise above): later checks need no stat()
+        self._preprocessed.add(self._pre_path(dt_file))
+
+    def preprocess_many(
+        self,
+        pairs: Iterable[Tuple[str, str]],
+        log_dir: Optional[str] = None,
+        stream: bool = True,
+        max_parallel: int = 1,
+        force: bool = False,
+    ) -> List[Tuple[str, str]]:
+        """Preprocess every (source_file, dt_file) pair whose .pre output is missing.
+
+        Duplicate pairs and already preprocessed datasets are skipped, so callers can
+        hand over every dataset they will touch in one call up front.
+        max_parallel: preprocessor processes allowed to run at once (datasets are
+            independent); output is then printed per dataset once it finishes.
+        force: preprocess even if the .pre exists (e.g. its source file changed)
+        Returns: the pairs that were actually preprocessed
+        """
+        pending = []
+        for source_file, dt_file in dict.fromkeys((str(src), str(dt)) for src, dt in pairs):
+            if not force and self.check_preprocessed(dt_file):
+                print(f"[{self.name}] Already preprocessed: {Path(dt_file).name}")
+            else:
+                pending.append((source_file, dt_file))
+
+        if max_parallel > 1 and len(pending) > 1:
+            jobs = [self._preprocess_job(src, dt, log_dir) for src, dt in pending]
+            results = run_commands_concurrently(
+                [cmd for cmd, _ in jobs],
+                max_parallel=max_parallel,
+                log_paths=[str(log_path) if log_path else None for _, log_path in jobs],
+                prefix=f"[{self.name}]",
+                stream_to_terminal=stream,
+            )
+            for (_, dt_file), result in zip(pending, results):
+                if isinstance(result, BaseException):
+                    raise result
+                self._preprocessed.add(self._pre_path(dt_file))
+        else:
+            for source_file, dt_file in pending:
+                self.preprocess_from_source(source_file, dt_file, log_dir=log_dir, stream=stream)
+        return pending
 
     def run_overlap(
         self,
@@ -100,103 +235,124 @@ class RaytracerAdapter(OverlapBenchmarkAdapter):
             return {"error": f"Executable not found: {self.executable}"}
 
         # Use preprocessed files if they exist in the preprocessed directory
-        input_path1 = Path(file1)
-        input_path2 = Path(file2)
-        p1 = self.preprocessed_dir / input_path1.with_suffix('.pre').name
-        p2 = self.preprocessed_dir / input_path2.with_suffix('.pre').name
+        p1 = self._pre_path(file1)
+        p2 = self._pre_path(file2)
         
-        f1 = str(p1) if p1.exists() else file1
-        f2 = str(p2) if p2.exists() else file2
+        f1 = str(p1) if self._pre_exists(p1) else file1
+        f2 = str(p2) if self._pre_exists(p2) else file2
 
-        runtimes = []
-        breakdown_accum = {} # key: phase name, value: list of durations
-        num_obj1 = 0
-        num_obj2 = 0
-        num_intersections = 0
-        
         print(f"[{self.name}] Running benchmark...")
 
         adapter_log_dir = None
         if log_dir:
             adapter_log_dir = Path(log_dir) / self.name
-            adapter_log_dir.mkdir(parents=True, exist_ok=True)
-
-        if self.mode == "exact":
-            expected_prefixes = ["query_", "gpu deduplication_", "download results_"]
-        elif self.mode == "estimated":
-            # For estimated mode, include selectivity estimation in query time
-            expected_prefixes = ["selectivity estimation_", "execute hash query_", "download results_"]
-        else:
-            # estimate_only
-            expected_prefixes = ["selectivity estimation_"]
+            self._ensure_dir(adapter_log_dir)
 
         # Execute num_runs times, each with warmup
+        cmd_base = [
+            str(self.executable),
+            "--mesh1", f1,
+            "--mesh2", f2,
+            "--runs", "1",
+            "--warmup-runs", str(self.warmup_runs),
+            "--no-export",
+        ]
+        if self.mode == "estimate_only":
+            cmd_base.append("--estimate-only")
+        cmd_base = self.pinned(cmd_base)
+        prefix = f"[{self.name}]"
+
+        json_outputs = []
+        cmds = []
+        log_paths = []
         for run_idx in range(num_runs):
-            json_output = self.timings_dir / f"timing_{self.mode}_{int(time.time())}_{run_idx}.json"
-            
-            cmd = [
-                str(self.executable),
-                "--mesh1", f1,
-                "--mesh2", f2,
-                "--runs", "1",
-                "--warmup-runs", str(self.warmup_runs),
-                "--no-export",
-                "--output", str(json_output)
-            ]
-
-            if self.mode == "estimate_only":
-                cmd.append("--estimate-only")
-            
+            json_output = self.timings_dir / f"{self._timing_stem}{run_idx}.json"
+            cmd = cmd_base + ["--output", str(json_output)]
+
+            log_path = None
+            if adapter_log_dir is not None:
+                log_path = str(adapter_log_dir / f"run_{run_idx:03d}.log")
+
+            json_outputs.append(json_output)
+            cmds.append(cmd)
+            log_paths.append(log_path)
+
+        run_results = None
+        if self.parallel_runs > 1 and num_runs > 1:
+            run_results = run_commands_concurrently(
+                cmds,
+                max_parallel=self.parallel_runs,
+                timeout=timeout,
+                log_paths=log_paths,
+                prefix=prefix,
+                stream_to_terminal=self.stream_output,
+            )
+
+        try:
+            return self._collect_runs(
+                cmds, json_outputs, log_paths, run_results, timeout
+            )
+        finally:
+            for json_output in json_outputs:
+                if json_output.exists():
+                    json_output.unlink()
+
+    def _collect_runs(
+        self,
+        cmds: List[List[str]],
+        json_outputs: List[Path],
+        log_paths: List[Optional[str]],
+        run_results: Optional[List[Any]],
+        timeout: Optional[float],
+    ) -> Dict[str, Any]:
+        """Run (or pick up already finished) repetitions and aggregate their timings."""
+        runtimes = []
+        breakdown_accum = {} # key: phase name, value: list of durations
+        summary = {"num_obj1": 0, "num_obj2": 0, "num_intersections": 0}
+        prefix = f"[{self.name}]"
+
+        for run_idx, (cmd, json_output, log_path) in enumerate(zip(cmds, json_outputs, log_paths)):
             try:
-                log_path = None
-                if adapter_log_dir is not None:
-                    log_path = str(adapter_log_dir / f"run_{run_idx:03d}.log")
-
-                stdout_text, stderr_text = run_command_streaming(
-                    cmd,
-                    timeout=timeout,
-                    log_path=log_path,
-                    prefix=f"[{self.name}]",
-                )
+                if run_results is not None:
+                    result = run_results[run_idx]
+                    if isinstance(result, BaseException):
+                        raise result
+                    stdout_text, stderr_text = result
+                else:
+                    stdout_text, stderr_text = run_command_streaming(
+                        cmd,
+                        timeout=timeout,
+                        log_path=log_path,
+                        prefix=prefix,
+                        stream_to_terminal=self.stream_output,
+                    )
                 
                 # Parse summary from stdout on the first run
                 if run_idx == 0:
-                    for line in stdout_text.splitlines():
-                        if "Mesh1 objects:" in line:
-                            num_obj1 = int(line.split(":")[1].strip())
-                        elif "Mesh2 objects:" in line:
-                            num_obj2 = int(line.split(":")[1].strip())
-                        elif "Unique object pairs:" in line:
-                            num_intersections = int(line.split(":")[1].strip())
-                        elif "Hash Table Query found" in line:
-                            # For estimated mode
-                            num_intersections = int(line.split("found")[1].split("unique")[0].strip())
-                        elif "Final Estimated Pairs:" in line:
-                            # For estimate-only mode (and useful diagnostic for estimated mode)
-                            try:
-                                num_intersections = int(line.split(":", 1)[1].strip())
-                            except ValueError:
-                                pass
+                    for match in _SUMMARY_RE.finditer(stdout_text):
+                        if match.group(1):
+                            summary[_SUMMARY_FIELDS[match.group(1)]] = int(match.group(2))
+                        else:
+                            summary["num_intersections"] = int(match.group(3))
 
                 if not json_output.exists():
                     return {"error": f"Timing JSON not found at {json_output}. Output:\n{stdout_text + stderr_text}"}
-
-                with open(json_output, 'r') as f:
-                    data = json.load(f)
+                else:
+                    with open(json_output, 'r') as f:
+                        data = json.load(f)
 
                 phases = data.get("phases", {})
                 query_time = 0.0
                 found = False
                 
                 # Accumulate breakdown
-                for prefix in expected_prefixes:
-                    key = f"{prefix}1" # Keys in json usually have '1' appended for the 1st run
+                for phase, key in self._expected_phases:
                     if key in phases:
                         duration = phases[key].get("duration_ms", 0.0)
                         query_time += duration
-                        if prefix not in breakdown_accum:
-                            breakdown_accum[prefix] = []
-                        breakdown_accum[prefix].append(duration)
+                        if phase not in breakdown_accum:
+                            breakdown_accum[phase] = []
+                        breakdown_accum[phase].append(duration)
                         found = True
 
                 if not found:
@@ -211,9 +367,6 @@ class RaytracerAdapter(OverlapBenchmarkAdapter):
                 return {"error": f"Raytracer failed with exit code {e.returncode}: {e.stderr}"}
             except json.JSONDecodeError:
                 return {"error": "Failed to parse timing JSON"}
-            finally:
-                if json_output.exists():
-                    json_output.unlink()
 
         if not runtimes:
             return {"error": "No timing results collected for Raytracer"}
@@ -221,16 +374,13 @@ class RaytracerAdapter(OverlapBenchmarkAdapter):
         # Calculate mean breakdown
         breakdown_stats = {}
         for phase, times in breakdown_accum.items():
-            breakdown_stats[phase] = np.mean(times)
+            breakdown_stats[phase] = statistics.fmean(times)
 
         return {
-            "mean": np.mean(runtimes),
-            "min": np.min(runtimes),
-            "max": np.max(runtimes),
-            "std": np.std(runtimes),
+            **runtime_stats(runtimes),
             "raw_times": runtimes,
             "breakdown": breakdown_stats,
-            "num_obj1": num_obj1,
-            "num_obj2": num_obj2,
-            "num_intersections": num_intersections
+            "num_obj1": summary["num_obj1"],
+            "num_obj2": summary["num_obj2"],
+            "num_intersections": summary["num_intersections"]
         }
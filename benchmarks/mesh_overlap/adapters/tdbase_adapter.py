@@ -1,10 +1,12 @@
 import subprocess
 import time
 import re
-import numpy as np
 from typing import Dict, Any, Optional
 from pathlib import Path
-from .base import OverlapBenchmarkAdapter, run_command_streaming
+from .base import OverlapBenchmarkAdapter, run_command_streaming, runtime_stats
+
+# Parse: "computation:    10.5554"
+_COMPUTATION_RE = re.compile(r"computation:\s+([\d.]+)")
 
 class TDBaseAdapter(OverlapBenchmarkAdapter):
     def __init__(self, tdbase_dir: str):
@@ -39,6 +41,7 @@ class TDBaseAdapter(OverlapBenchmarkAdapter):
         for lod in lods:
             cmd_base.extend(["-l", str(lod)])
         cmd_base.append("-g")
+        cmd_base = self.pinned(cmd_base)
 
         print(f"[{self.name}] Running TDBase with LODs {lods} (GPU) ...")
 
@@ -47,6 +50,8 @@ class TDBaseAdapter(OverlapBenchmarkAdapter):
             adapter_log_dir = Path(log_dir) / self.name
             adapter_log_dir.mkdir(parents=True, exist_ok=True)
 
+        prefix = f"[{self.name}]"
+        cmd_str = " ".join(cmd_base)
         for run_idx in range(num_runs):
             try:
                 log_path = None
@@ -56,15 +61,15 @@ class TDBaseAdapter(OverlapBenchmarkAdapter):
                     cmd_base,
                     timeout=timeout,
                     log_path=log_path,
-                    prefix=f"[{self.name}]",
+                    prefix=prefix,
+                    stream_to_terminal=self.stream_output,
+                    cmd_str=cmd_str,
                 )
-                output = stdout_text + stderr_text
-                # Parse: "computation:    10.5554" 
-                match = re.search(r"computation:\s+([\d.]+)", output)
+                match = _COMPUTATION_RE.search(stdout_text) or _COMPUTATION_RE.search(stderr_text)
                 if match:
                     runtimes.append(float(match.group(1)))
                 else:
-                    print(f"[{self.name}] Error: Could not find 'computation' timing in output. Result:\n{output}")
+                    print(f"[{self.name}] Error: Could not find 'computation' timing in output. Result:\n{stdout_text + stderr_text}")
                     return {"error": "Computation timing not found"}
             except subprocess.TimeoutExpired:
                 print(f"[{self.name}] Timeout reached ({timeout}s)")
@@ -77,10 +82,7 @@ class TDBaseAdapter(OverlapBenchmarkAdapter):
 
         # Return aggregate stats over the runs (each run processed all LODs)
         return {
-            "mean": float(np.mean(runtimes)),
-            "min": float(np.min(runtimes)),
-            "max": float(np.max(runtimes)),
-            "std": float(np.std(runtimes)),
+            **runtime_stats(runtimes),
             "raw_times": [float(x) for x in runtimes],
             "lods": lods,
             "gpu": True
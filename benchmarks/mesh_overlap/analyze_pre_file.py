@@ -28,50 +28,92 @@ The .pre file format (binary):
     - float VolRatio
 """
 
-import struct
+import os
 import numpy as np
 import argparse
 from pathlib import Path
 from typing import Tuple, Dict, Any
-import matplotlib.pyplot as plt
+
+from _kernels import HAVE_NUMBA
+if HAVE_NUMBA:
+    from _kernels import make_raw_estimate_kernel
 
 
 BINARY_FILE_MAGIC = 0x52334442  # "R3DB"
 
+_HAVE_FADVISE = hasattr(os, 'posix_fadvise')
+
+# FileHeader (48 bytes)
+_HEADER_DT = np.dtype([
+    ('magic', '<u4'),
+    ('version', '<u4'),
+    ('numVertices', '<u8'),
+    ('numIndices', '<u8'),
+    ('numMappings', '<u8'),
+    ('totalTriangles', '<u8'),
+    ('hasGrid', 'u1'),
+    ('padding', 'u1', (7,)),
+])
+
+# GridParams (40 bytes)
+_GRID_PARAMS_DT = np.dtype([
+    ('minBound', '<f4', (3,)),
+    ('maxBound', '<f4', (3,)),
+    ('resolution', '<u4', (3,)),
+    ('padding', '<u4'),
+])
+
+# GridCell (16 bytes)
+_CELL_DT = np.dtype([
+    ('CenterCount', '<u4'),
+    ('TouchCount', '<u4'),
+    ('AvgSizeMean', '<f4'),
+    ('VolRatio', '<f4'),
+])
+
 
 def read_pre_file(filepath: str) -> Dict[str, Any]:
     """Read a .pre file and return parsed data."""
     data = {}
     
     with open(filepath, 'rb') as f:
-        # Read header (48 bytes)
-        # uint32_t magic, version
-        # uint64_t numVertices, numIndices, numMappings, totalTriangles
-        # uint8_t hasGrid + 7 bytes padding
-        header_bytes = f.read(48)
-        magic, version = struct.unpack('<II', header_bytes[:8])
-        numVertices, numIndices, numMappings, totalTriangles = struct.unpack('<QQQQ', header_bytes[8:40])
-        hasGrid = struct.unpack('<B', header_bytes[40:41])[0]
+        if _HAVE_FADVISE:
+            # The file is read once, front to back: ask for aggressive readahead
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
         
+        header = np.fromfile(f, dtype=_HEADER_DT, count=1)
+        if header.size == 0:
+            raise ValueError(f"File too short for a .pre header: {filepath}")
+        header = header[0]
+        
+        magic = int(header['magic'])
         if magic != BINARY_FILE_MAGIC:
             raise ValueError(f"Invalid magic number: {hex(magic)} (expected {hex(BINARY_FILE_MAGIC)})")
         
-        data['version'] = version
+        numVertices = int(header['numVertices'])
+        numIndices = int(header['numIndices'])
+        numMappings = int(header['numMappings'])
+        hasGrid = bool(header['hasGrid'])
+        
+        data['version'] = int(header['version'])
         data['numVertices'] = numVertices
         data['numIndices'] = numIndices
         data['numMappings'] = numMappings
-        data['totalTriangles'] = totalTriangles
-        data['hasGrid'] = bool(hasGrid)
+        data['totalTriangles'] = int(header['totalTriangles'])
+        data['hasGrid'] = hasGrid
         
         # Skip main data arrays to read grid
-        f.seek(48 + numVertices * 12 + numIndices * 12 + numMappings * 4)
+        grid_offset = _HEADER_DT.itemsize + numVertices * 12 + numIndices * 12 + numMappings * 4
+        f.seek(grid_offset)
         
         if hasGrid:
-            # Read GridParams (40 bytes)
-            grid_params = f.read(40)
-            minBound = struct.unpack('<3f', grid_params[:12])
-            maxBound = struct.unpack('<3f', grid_params[12:24])
-            resolution = struct.unpack('<3I', grid_params[24:36])
+            grid_params = np.fromfile(f, dtype=_GRID_PARAMS_DT, count=1)
+            if grid_params.size == 0:
+                raise ValueError(f"File too short for grid parameters: {filepath}")
+            grid_params = grid_params[0]
+            minBound = tuple(float(x) for x in grid_params['minBound'])
+            maxBound = tuple(float(x) for x in grid_params['maxBound'])
+            resolution = tuple(int(x) for x in grid_params['resolution'])
             
             grid_dict: Dict[str, Any] = {
                 'minBound': minBound,
@@ -82,20 +124,41 @@ def read_pre_file(filepath: str) -> Dict[str, Any]:
             
             numCells = resolution[0] * resolution[1] * resolution[2]
             
-            # Read GridCells
-            cells_data = f.read(numCells * 16)
-            cells = np.frombuffer(cells_data, dtype=[
-                ('CenterCount', np.uint32),
-                ('TouchCount', np.uint32),
-                ('AvgSizeMean', np.float32),
-                ('VolRatio', np.float32),
-            ])
-            
-            grid_dict['cells'] = cells
+            # Read GridCells straight into an array (no intermediate bytes copy) and split the
+            # 16-byte records into one contiguous array per field, so single-column math
+            # only streams the bytes it uses.
+            cells = np.fromfile(f, dtype=_CELL_DT, count=numCells)
+            if cells.size != numCells:
+                raise ValueError(f"File too short for {numCells} grid cells: {filepath}")
+            for field in _CELL_DT.names:
+                grid_dict[field] = np.ascontiguousarray(cells[field])
+            del cells
+        
+        if _HAVE_FADVISE:
+            # Everything needed has been copied out; drop the file from the page cache so
+            # multi-GB grids don't crowd out memory for subsequent benchmark runs.
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
         
     return data
 
 
+def _grid_geometry(grid: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    World size, cell size and cell volume of a grid.
+    Computed once per grid and cached on it, since analysis and every comparison need them.
+    Returns: (worldSize, cellSize, cellVolume)
+    """
+    geometry = grid.get('_geometry')
+    if geometry is None:
+        minB = np.asarray(grid['minBound'], dtype=np.float64)
+        maxB = np.asarray(grid['maxBound'], dtype=np.float64)
+        res = np.asarray(grid['resolution'], dtype=np.float64)
+        worldSize = maxB - minB
+        cellSize = worldSize / res
+        geometry = grid['_geometry'] = (worldSize, cellSize, float(cellSize.prod()))
+    return geometry
+
+
 def analyze_grid(data: Dict[str, Any], name: str):
     """Analyze grid statistics and print summary."""
     if not data['hasGrid']:
@@ -103,18 +166,24 @@ def analyze_grid(data: Dict[str, Any], name: str):
         return
     
     grid = data['grid']
-    cells = grid['cells']
     resolution = grid['resolution']
     minBound = grid['minBound']
     maxBound = grid['maxBound']
     
     # Calculate world and cell size
-    worldSize = tuple(maxBound[i] - minBound[i] for i in range(3))
-    cellSize = tuple(worldSize[i] / resolution[i] for i in range(3))
-    cellVolume = cellSize[0] * cellSize[1] * cellSize[2]
+    worldSize, cellSize, cellVolume = _grid_geometry(grid)
     
     numCells = resolution[0] * resolution[1] * resolution[2]
-    nonEmptyCells = np.sum(cells['TouchCount'] > 0)
+    
+    # Occupancy masks and masked columns, computed once and reused below
+    touch_counts = grid['TouchCount']
+    nonempty_mask = touch_counts > 0
+    nonEmptyCells = np.count_nonzero(nonempty_mask)
+    nonzero_touch = touch_counts[nonempty_mask]
+    avg_sizes = grid['AvgSizeMean'][nonempty_mask]
+    vol_ratios = grid['VolRatio'][nonempty_mask]
+    center_counts = grid['CenterCount']
+    nonzero_center = center_counts[center_counts > 0]
     
     print(f"\n{'='*60}")
     print(f"Analysis of {name}")
@@ -137,18 +206,16 @@ def analyze_grid(data: Dict[str, Any], name: str):
     print(f"  Non-empty cells: {nonEmptyCells:,} ({100*nonEmptyCells/numCells:.2f}%)")
     
     # TouchCount statistics
-    touch_counts = cells['TouchCount']
-    nonzero_touch = touch_counts[touch_counts > 0]
+    # (the masked arrays are private copies, so medians may partition them in place:
+    #  O(N) selection without np.median's extra copy; later stats are order-independent)
     print(f"\n  TouchCount (non-zero cells):")
     print(f"    Min:    {np.min(nonzero_touch):,}")
     print(f"    Max:    {np.max(nonzero_touch):,}")
     print(f"    Mean:   {np.mean(nonzero_touch):.2f}")
-    print(f"    Median: {np.median(nonzero_touch):.2f}")
+    print(f"    Median: {np.median(nonzero_touch, overwrite_input=True):.2f}")
     print(f"    Sum:    {np.sum(touch_counts):,}")
     
     # CenterCount statistics
-    center_counts = cells['CenterCount']
-    nonzero_center = center_counts[center_counts > 0]
     if len(nonzero_center) > 0:
         print(f"\n  CenterCount (non-zero cells):")
         print(f"    Non-zero count: {len(nonzero_center):,}")
@@ -157,36 +224,59 @@ def analyze_grid(data: Dict[str, Any], name: str):
         print(f"    Sum:    {np.sum(center_counts):,}")
     
     # AvgSizeMean statistics
-    avg_sizes = cells['AvgSizeMean'][cells['TouchCount'] > 0]
     print(f"\n  AvgSizeMean (non-zero cells):")
     print(f"    Min:    {np.min(avg_sizes):.6f}")
     print(f"    Max:    {np.max(avg_sizes):.6f}")
     print(f"    Mean:   {np.mean(avg_sizes):.6f}")
-    print(f"    Median: {np.median(avg_sizes):.6f}")
+    print(f"    Median: {np.median(avg_sizes, overwrite_input=True):.6f}")
     
     # Compare to cell size
     avg_obj_size = np.mean(avg_sizes)
     print(f"\n  Object Size vs Cell Size:")
     print(f"    Avg object size: {avg_obj_size:.6f}")
-    print(f"    Cell diagonal:   {np.sqrt(sum(c**2 for c in cellSize)):.6f}")
-    print(f"    Ratio (obj/cell diagonal): {avg_obj_size / np.sqrt(sum(c**2 for c in cellSize)):.4f}")
+    cell_diagonal = np.sqrt(np.dot(cellSize, cellSize))
+    print(f"    Cell diagonal:   {cell_diagonal:.6f}")
+    print(f"    Ratio (obj/cell diagonal): {avg_obj_size / cell_diagonal:.4f}")
     
     # VolRatio statistics
-    vol_ratios = cells['VolRatio'][cells['TouchCount'] > 0]
     print(f"\n  VolRatio (non-zero cells):")
     print(f"    Min:    {np.min(vol_ratios):.6f}")
     print(f"    Max:    {np.max(vol_ratios):.6f}")
     print(f"    Mean:   {np.mean(vol_ratios):.6f}")
-    print(f"    Median: {np.median(vol_ratios):.6f}")
+    print(f"    Median: {np.median(vol_ratios, overwrite_input=True):.6f}")
     
     return {
         'cellVolume': cellVolume,
         'cellSize': cellSize,
-        'cells': cells,
         'avgSize': avg_obj_size,
     }
 
 
+def cell_probabilities(grid1: Dict[str, Any], grid2: Dict[str, Any], cellVolume: float,
+                       gamma: float, epsilon: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per-cell pair probability for cells occupied in both grids.
+    Returns: (indices of cells occupied in both, probability per indexed cell)
+    """
+    # Resolve the overlap to indices once: typical grids are sparse, so the pow below
+    # only runs on the few cells that matter and each column is gathered directly.
+    idx = np.flatnonzero((grid1['TouchCount'] > 0) & (grid2['TouchCount'] > 0))
+    
+    # The cell columns are float32; keep the scalars float32 too so the intermediates
+    # are not promoted to float64 (half the memory traffic). Callers reduce in float64.
+    combined_size = grid1['AvgSizeMean'][idx] + grid2['AvgSizeMean'][idx] + np.float32(epsilon)
+    minkowski_vol = combined_size * combined_size * combined_size
+    prob = minkowski_vol / np.float32(cellVolume)
+    
+    # sqrt(vr1 * vr2) ** gamma as a single pow
+    half_gamma = np.float32(0.5 * gamma)
+    shape_correction = (grid1['VolRatio'][idx] * grid2['VolRatio'][idx]) ** half_gamma
+    
+    prob *= shape_correction
+    np.minimum(prob, 1.0, out=prob)
+    return idx, prob
+
+
 def estimate_overlap(data1: Dict[str, Any], data2: Dict[str, Any], gamma: float = 0.8, epsilon: float = 0.001) -> Dict[str, Any]:
     """
     Reproduce the overlap estimation algorithm.
@@ -194,67 +284,37 @@ def estimate_overlap(data1: Dict[str, Any], data2: Dict[str, Any], gamma: float
     """
     grid1 = data1['grid']
     grid2 = data2['grid']
-    cells1 = grid1['cells']
-    cells2 = grid2['cells']
-    
-    res = grid1['resolution']
-    minBound = grid1['minBound']
-    maxBound = grid1['maxBound']
     
-    worldSize = tuple(maxBound[i] - minBound[i] for i in range(3))
-    cellSize = tuple(worldSize[i] / res[i] for i in range(3))
-    cellVolume = cellSize[0] * cellSize[1] * cellSize[2]
+    _, _, cellVolume = _grid_geometry(grid1)
     
     # Per-cell estimation
-    raw_estimate = 0.0
+    tc1 = grid1['TouchCount']
+    tc2 = grid2['TouchCount']
+    if HAVE_NUMBA:
+        raw_estimate = float(make_raw_estimate_kernel(gamma, epsilon)(
+            tc1, tc2,
+            grid1['AvgSizeMean'], grid2['AvgSizeMean'],
+            grid1['VolRatio'], grid2['VolRatio'],
+            cellVolume,
+        ))
+    else:
+        idx, prob = cell_probabilities(grid1, grid2, cellVolume, gamma, epsilon)
+        raw_estimate = float(np.dot(tc1[idx].astype(np.float64) * tc2[idx], prob.astype(np.float64)))
     
-    for i in range(len(cells1)):
-        tc1 = cells1['TouchCount'][i]
-        tc2 = cells2['TouchCount'][i]
-        
-        if tc1 == 0 or tc2 == 0:
-            continue
-        
-        avg1 = cells1['AvgSizeMean'][i]
-        avg2 = cells2['AvgSizeMean'][i]
-        vr1 = cells1['VolRatio'][i]
-        vr2 = cells2['VolRatio'][i]
-        
-        combined_size = avg1 + avg2 + epsilon
-        minkowski_vol = combined_size ** 3
-        prob = minkowski_vol / cellVolume
-        
-        combined_ratio = np.sqrt(vr1 * vr2)
-        shape_correction = combined_ratio ** gamma
-        
-        prob *= shape_correction
-        prob = min(prob, 1.0)
-        
-        raw_estimate += tc1 * tc2 * prob
-    
-    # Calculate global average sizes and volume ratios
-    def calc_global_avg_size(cells):
-        total_size = 0.0
-        total_count = 0
-        for c in cells:
-            if c['TouchCount'] > 0:
-                total_size += c['AvgSizeMean'] * c['TouchCount']
-                total_count += c['TouchCount']
-        return total_size / total_count if total_count > 0 else 0.0
-    
-    def calc_global_avg_vol_ratio(cells):
-        total_ratio = 0.0
-        total_count = 0
-        for c in cells:
-            if c['TouchCount'] > 0:
-                total_ratio += c['VolRatio'] * c['TouchCount']
-                total_count += c['TouchCount']
-        return total_ratio / total_count if total_count > 0 else 1.0
+    # Calculate global average sizes and volume ratios (TouchCount-weighted)
+    def calc_global_averages(grid):
+        tc = grid['TouchCount']
+        occupied = tc > 0
+        weights = tc[occupied].astype(np.float64)
+        total_count = weights.sum()
+        if total_count == 0:
+            return 0.0, 1.0
+        avg_size = float(np.dot(grid['AvgSizeMean'][occupied], weights) / total_count)
+        avg_vol_ratio = float(np.dot(grid['VolRatio'][occupied], weights) / total_count)
+        return avg_size, avg_vol_ratio
     
-    avg_size1 = calc_global_avg_size(cells1)
-    avg_size2 = calc_global_avg_size(cells2)
-    avg_vol_ratio1 = calc_global_avg_vol_ratio(cells1)
-    avg_vol_ratio2 = calc_global_avg_vol_ratio(cells2)
+    avg_size1, avg_vol_ratio1 = calc_global_averages(grid1)
+    avg_size2, avg_vol_ratio2 = calc_global_averages(grid2)
     
     # Shape-corrected effective sizes
     effective_size1 = avg_size1 * np.cbrt(avg_vol_ratio1)
@@ -295,13 +355,13 @@ def main():
         path = Path(filepath)
         print(f"\nLoading {path.name}...")
         data = read_pre_file(filepath)
-        all_data[path.name] = analyze_grid(data, path.name)
-        all_data[path.name]['data'] = data
+        all_data[filepath] = {'analysis': analyze_grid(data, path.name), 'data': data}
     
     if args.compare and len(args.files) >= 2:
         file1, file2 = args.files[:2]
-        data1 = read_pre_file(file1)
-        data2 = read_pre_file(file2)
+        # Reuse the grids loaded above instead of reading the files again
+        data1 = all_data[file1]['data']
+        data2 = all_data[file2]['data']
         
         print(f"\n{'='*60}")
         print(f"Overlap Estimation: {Path(file1).name} x {Path(file2).name}")
@@ -338,12 +398,15 @@ def main():
             print(f"ℹ️  Low alpha ({result['alpha']:.2f}): Objects are smaller than cells")
         
         # Check cell coverage
-        cells1 = data1['grid']['cells']
-        cells2 = data2['grid']['cells']
+        grid1 = data1['grid']
+        grid2 = data2['grid']
         
-        both_occupied = np.sum((cells1['TouchCount'] > 0) & (cells2['TouchCount'] > 0))
-        only1 = np.sum((cells1['TouchCount'] > 0) & (cells2['TouchCount'] == 0))
-        only2 = np.sum((cells1['TouchCount'] == 0) & (cells2['TouchCount'] > 0))
+        # Occupancy code per cell: bit 0 = dataset1, bit 1 = dataset2; one bincount gives all three
+        occupancy = (grid1['TouchCount'] > 0).view(np.uint8) | ((grid2['TouchCount'] > 0).view(np.uint8) << 1)
+        occupancy_counts = np.bincount(occupancy, minlength=4)
+        only1 = occupancy_counts[1]
+        only2 = occupancy_counts[2]
+        both_occupied = occupancy_counts[3]
         
         print(f"\nCell Overlap:")
         print(f"  Cells with both datasets: {both_occupied:,}")
@@ -352,37 +415,12 @@ def main():
         
         # Analyze where pairs could be missed
         # Check probability values in overlapping cells
-        prob_values = []
-        cellVol = result['cellVolume']
-        for i in range(len(cells1)):
-            tc1 = cells1['TouchCount'][i]
-            tc2 = cells2['TouchCount'][i]
-            
-            if tc1 == 0 or tc2 == 0:
-                continue
-            
-            avg1_cell = cells1['AvgSizeMean'][i]
-            avg2_cell = cells2['AvgSizeMean'][i]
-            vr1 = cells1['VolRatio'][i]
-            vr2 = cells2['VolRatio'][i]
-            
-            combined_size = avg1_cell + avg2_cell + args.epsilon
-            minkowski_vol = combined_size ** 3
-            prob = minkowski_vol / cellVol
-            
-            combined_ratio = np.sqrt(vr1 * vr2)
-            shape_correction = combined_ratio ** args.gamma
-            
-            prob *= shape_correction
-            prob = min(prob, 1.0)
-            prob_values.append(prob)
-        
-        prob_values = np.array(prob_values)
+        _, prob_values = cell_probabilities(grid1, grid2, result['cellVolume'], args.gamma, args.epsilon)
         print(f"\nProbability Distribution in Overlapping Cells:")
         print(f"  Min:    {np.min(prob_values):.6f}")
         print(f"  Max:    {np.max(prob_values):.6f}")
         print(f"  Mean:   {np.mean(prob_values):.6f}")
-        print(f"  Median: {np.median(prob_values):.6f}")
+        print(f"  Median: {np.median(prob_values, overwrite_input=True):.6f}")
         print(f"  Cells at prob=1.0: {np.sum(prob_values >= 1.0):,}")
         
         if np.mean(prob_values) < 0.5:
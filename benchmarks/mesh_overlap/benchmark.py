@@ -3,7 +3,9 @@ import time
 import argparse
 import json
 import os
+import resource
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime
 from adapters import TDBaseAdapter, CGALAdapter, RaytracerAdapter
@@ -11,17 +13,33 @@ import numpy as np
 
 
 class _Tee:
+    """Duplicate writes to several streams, forwarding whole lines at a time."""
+
     def __init__(self, *streams):
         self._streams = streams
+        self._buf = []
 
     def write(self, data):
+        self._buf.append(data)
+        if "\n" in data:
+            self._drain()
+
+    def _drain(self):
+        if not self._buf:
+            return
+        text = "".join(self._buf)
+        self._buf.clear()
         for s in self._streams:
-            s.write(data)
+            s.write(text)
 
     def flush(self):
+        self._drain()
         for s in self._streams:
             s.flush()
 
+    def isatty(self):
+        return self._streams[0].isatty()
+
 # Dataset configurations
 # Format: (file1_dt, file2_dt, file1_source, file2_source)
 # source files are used for RaySpace/CGAL preprocessing, dt files for TDBase queries
@@ -60,6 +78,40 @@ PREPROCESSED_DIR = DATA_DIR / "preprocessed"
 TIMINGS_DIR = DATA_DIR / "timings"
 RUNS_DIR = SCRIPT_DIR / "runs"
 
+def _parse_cpu_list(spec):
+    """Parse a taskset-style CPU list such as '0-3,6' into a set of CPU ids."""
+    cpus = set()
+    for part in spec.split(","):
+        lo, _, hi = part.partition("-")
+        cpus.update(range(int(lo), int(hi or lo) + 1))
+    return cpus
+
+def _format_cpu_list(cpus):
+    """Format a set of CPU ids as a taskset-style CPU list."""
+    return ",".join(str(c) for c in sorted(cpus))
+
+def _can_renice(increment):
+    """Whether children can be reniced back by -increment after the harness lowers itself."""
+    if os.geteuid() == 0:
+        return True
+    # RLIMIT_NICE allows lowering niceness down to 20 - soft limit
+    soft, _ = resource.getrlimit(resource.RLIMIT_NICE)
+    return soft == resource.RLIM_INFINITY or 20 - soft <= os.getpriority(os.PRIO_PROCESS, 0)
+
+def _np_default(o):
+    """json default= hook: convert numpy scalars/arrays (at any nesting depth) to native python."""
+    if isinstance(o, np.floating):
+        return float(o)
+    if isinstance(o, np.integer):
+        return int(o)
+    if isinstance(o, np.ndarray):
+        return o.tolist()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+def _run_adapter(adapter, file1, file2, runs, timeout, log_dir):
+    """ProcessPoolExecutor entry point: run one adapter's overlap benchmark."""
+    return adapter.run_overlap(file1, file2, runs, timeout=timeout, log_dir=log_dir)
+
 def print_results(adapter_name, results):
     if "error" in results:
         print(f"[{adapter_name}] Failed: {results['error']}")
@@ -86,13 +138,34 @@ def main():
     parser.add_argument("--timings-dir", type=str, default=str(TIMINGS_DIR), help="Directory for timing JSON files (default: mesh_overlap_benchmark/data/timings)")
     parser.add_argument("--grid-resolution", type=int, default=10, help="Grid resolution for RaySpace preprocessing (default: 10)")
     parser.add_argument("--raytracer-warmup-runs", type=int, default=1, help="Warmup iterations per raytracer invocation (default: 1; set 0 to disable)")
+    parser.add_argument("--raytracer-parallel-runs", type=int, default=1, help="Raytracer repetitions allowed to run concurrently (default: 1; only for runs that do not saturate the GPU)")
+    parser.add_argument("--parallel-jobs", type=int, default=1, help="Adapters to run concurrently in separate processes (default: 1 = serial; concurrent adapters compete for CPU/GPU, so timings are not comparable to serial runs)")
     parser.add_argument("--timeout", type=float, default=120.0, help="Timeout for query execution in seconds (default: 120.0)")
     parser.add_argument("--threads", type=int, default=None, help="Number of threads for parallel approaches (default: all available)")
     parser.add_argument("--log-dir", type=str, default=str(RUNS_DIR / "logs"), help="Directory to write run logs (default: mesh_overlap_benchmark/runs/logs)")
+    parser.add_argument("--bench-cpus", type=str, default=None, help="CPU list (taskset syntax, e.g. '2-7') to pin benchmarked processes to")
+    parser.add_argument("--harness-cpus", type=str, default=None, help="CPU list (e.g. '0-1') to pin this harness process to, away from --bench-cpus")
+    parser.add_argument("--harness-nice", type=int, default=0, help="Niceness increment for this harness process (default: 0)")
+    parser.add_argument("--no-stream", action="store_true", help="Do not echo benchmarked process output to the terminal")
     parser.add_argument("--no-logs", action="store_true", help="Disable writing benchmark/adapters logs to files")
     
     args = parser.parse_args()
 
+    # Keep the harness (output streaming, parsing) from competing with the measured process.
+    # Affinity and niceness are inherited, so benchmarked processes get them reset via pinned().
+    if args.harness_nice < 0:
+        parser.error("--harness-nice must not be negative")
+    if args.harness_nice and not _can_renice(args.harness_nice):
+        parser.error("--harness-nice needs permission to restore the benchmarked processes' "
+                     "priority (root or a sufficient RLIMIT_NICE)")
+    bench_cpus = args.bench_cpus
+    if args.harness_cpus:
+        if not bench_cpus:
+            bench_cpus = _format_cpu_list(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, _parse_cpu_list(args.harness_cpus))
+    if args.harness_nice:
+        os.nice(args.harness_nice)
+
     orig_stdout = sys.stdout
     orig_stderr = sys.stderr
 
@@ -150,11 +223,16 @@ def main():
         if "tdbase" in args.approaches:
             adapters.append(TDBaseAdapter(str(TDBASE_DIR)))
         if "raytracer_exact" in args.approaches:
-            adapters.append(RaytracerAdapter(str(RAYSPACE_DIR), mode="exact", preprocessed_dir=str(preprocessed_dir), timings_dir=str(timings_dir), grid_resolution=args.grid_resolution, warmup_runs=args.raytracer_warmup_runs))
+            adapters.append(RaytracerAdapter(str(RAYSPACE_DIR), mode="exact", preprocessed_dir=str(preprocessed_dir), timings_dir=str(timings_dir), grid_resolution=args.grid_resolution, warmup_runs=args.raytracer_warmup_runs, parallel_runs=args.raytracer_parallel_runs))
         if "raytracer_estimated" in args.approaches:
-            adapters.append(RaytracerAdapter(str(RAYSPACE_DIR), mode="estimated", preprocessed_dir=str(preprocessed_dir), timings_dir=str(timings_dir), grid_resolution=args.grid_resolution, warmup_runs=args.raytracer_warmup_runs))
+            adapters.append(RaytracerAdapter(str(RAYSPACE_DIR), mode="estimated", preprocessed_dir=str(preprocessed_dir), timings_dir=str(timings_dir), grid_resolution=args.grid_resolution, warmup_runs=args.raytracer_warmup_runs, parallel_runs=args.raytracer_parallel_runs))
         if "raytracer_estimate_only" in args.approaches:
-            adapters.append(RaytracerAdapter(str(RAYSPACE_DIR), mode="estimate_only", preprocessed_dir=str(preprocessed_dir), timings_dir=str(timings_dir), grid_resolution=args.grid_resolution, warmup_runs=args.raytracer_warmup_runs))
+            adapters.append(RaytracerAdapter(str(RAYSPACE_DIR), mode="estimate_only", preprocessed_dir=str(preprocessed_dir), timings_dir=str(timings_dir), grid_resolution=args.grid_resolution, warmup_runs=args.raytracer_warmup_runs, parallel_runs=args.raytracer_parallel_runs))
+
+        for adapter in adapters:
+            adapter.stream_output = not args.no_stream
+            adapter.bench_cpus = bench_cpus
+            adapter.harness_nice = args.harness_nice
 
         all_results = {}
         ssot_stats = {"num_obj1": 0, "num_obj2": 0, "num_intersections": 0}
@@ -172,23 +250,59 @@ def main():
                 else:
                     print(f"Dataset already preprocessed: {f_dt.name}")
 
+        # Results are saved to the runs directory with timestamp. Each adapter's result is
+        # also appended to a JSON Lines file as soon as it finishes, so an interrupted run
+        # keeps what was already measured.
+        output_file = RUNS_DIR / f"{run_name}.json"
+        partial_file = output_file.with_suffix(".jsonl")
+
         print(f"\n--- Running Benchmark (Runs: {args.runs}) ---")
         print(f"Dataset 1: {file1_path}")
         print(f"Dataset 2: {file2_path}")
 
-        for adapter in adapters:
-            print(f"\nRunning {adapter.name}...")
-            results = adapter.run_overlap(
-                str(file1_path),
-                str(file2_path),
-                args.runs,
-                timeout=args.timeout,
-                log_dir=str(run_log_dir) if run_log_dir else None,
-            )
-            print_results(adapter.name, results)
+        log_dir = str(run_log_dir) if run_log_dir else None
+
+        def record(adapter, results):
             all_results[adapter.name] = results
-            
-            # Capture SSOT stats if this is a raytracer
+            with open(partial_file, "a") as f:
+                f.write(json.dumps({"adapter": adapter.name, **results}, default=_np_default) + "\n")
+
+        if args.parallel_jobs > 1 and len(adapters) > 1:
+            # Adapters drive independent processes; run them side by side and persist each
+            # result as it arrives. Reporting below keeps the requested adapter order.
+            print(f"\nRunning {len(adapters)} adapters ({min(len(adapters), args.parallel_jobs)} at a time)...")
+            with ProcessPoolExecutor(max_workers=min(len(adapters), args.parallel_jobs)) as pool:
+                futures = {
+                    pool.submit(_run_adapter, adapter, str(file1_path), str(file2_path),
+                                args.runs, args.timeout, log_dir): adapter
+                    for adapter in adapters
+                }
+                for fut in as_completed(futures):
+                    adapter = futures[fut]
+                    try:
+                        results = fut.result()
+                    except Exception as e:
+                        results = {"error": f"{type(e).__name__}: {e}"}
+                    record(adapter, results)
+            for adapter in adapters:
+                print_results(adapter.name, all_results[adapter.name])
+        else:
+            for adapter in adapters:
+                print(f"\nRunning {adapter.name}...")
+                results = adapter.run_overlap(
+                    str(file1_path),
+                    str(file2_path),
+                    args.runs,
+                    timeout=args.timeout,
+                    log_dir=log_dir,
+                )
+                print_results(adapter.name, results)
+                record(adapter, results)
+
+        # Capture SSOT stats from the raytracer results (in adapter order, so the choice
+        # does not depend on which job finished first)
+        for adapter in adapters:
+            results = all_results[adapter.name]
             if "Raytracer" in adapter.name and "error" not in results:
                 # Prefer exact if available, or if this is the first one we find
                 if adapter.name == "Raytracer_exact" or ssot_stats["num_obj1"] == 0:
@@ -232,10 +346,6 @@ def main():
             print("\n--- Join Statistics (SSOT) ---")
             print("  SSOT not computed (no exact/estimated join was requested).")
 
-        # Save results to runs directory with timestamp
-        output_file = RUNS_DIR / f"{run_name}.json"
-
-        # Convert numpy types to native python for json serialization
         json_results = {
             "metadata": {
                 "timestamp": timestamp,
@@ -252,29 +362,16 @@ def main():
                 "num_intersections": int(ssot_stats["num_intersections"]),
                 "selectivity": float(selectivity)
             },
-            "results": {}
+            "results": all_results
         }
 
-        for name, res in all_results.items():
-            if "error" in res:
-                json_results["results"][name] = res
-            else:
-                json_results["results"][name] = {
-                    k: (
-                        float(v)
-                        if isinstance(v, (np.floating, float))
-                        else [float(x) for x in v]
-                        if isinstance(v, list)
-                        else v
-                    )
-                    for k, v in res.items()
-                }
-
         with open(output_file, 'w') as f:
-            json.dump(json_results, f, indent=4)
+            json.dump(json_results, f, indent=4, default=_np_default)
         print(f"\nResults saved to {output_file}")
     finally:
         # Restore streams before closing the tee log file (prevents flush-on-exit issues)
+        sys.stdout.flush()
+        sys.stderr.flush()
         sys.stdout = orig_stdout
         sys.stderr = orig_stderr
         if tee_file_handle is not None:
@@ -1,29 +1,57 @@
 
 import sys
 from pathlib import Path
+import numpy as np
 sys.path.append(str(Path(__file__).parent))
 from adapters import RaytracerAdapter
 
+# Unit cube corners (OBJ vertex order 1..8) and its 12 triangles; identical for every cube
+CUBE_OFFSETS = np.array([
+    [-1, -1, -1], [1, -1, -1], [1, 1, -1], [-1, 1, -1],
+    [-1, -1, 1], [1, -1, 1], [1, 1, 1], [-1, 1, 1],
+], dtype=np.float64)
+CUBE_FACES = np.array([
+    (1,3,2), (1,4,3), (5,6,7), (5,7,8),
+    (1,2,6), (1,6,5), (2,3,7), (2,7,6),
+    (3,4,8), (3,8,7), (4,1,5), (4,5,8)
+], dtype=np.float64)
+# One OBJ object per cube, filled from a flat row of 24 coordinates + 36 face indices
+CUBE_OBJ_TEMPLATE = "o cube\n" + "v %r %r %r\n" * 8 + "f %d %d %d\n" * 12
+
+def cube_vertices(centers, sizes):
+    """Corners of each cube: (N, 8, 3) for (N, 3) centers and (N,) edge lengths."""
+    centers = np.asarray(centers, dtype=np.float64)
+    sizes = np.asarray(sizes, dtype=np.float64)
+    return centers[:, None, :] + (0.5 * sizes)[:, None, None] * CUBE_OFFSETS
+
+def create_cubes_obj(path, centers, sizes):
+    """Write N cubes as OBJ in one pass; returns False (leaving the file alone) if it is already up to date."""
+    verts = cube_vertices(centers, sizes)
+    n = len(verts)
+    faces = CUBE_FACES + 8.0 * np.arange(n)[:, None, None]
+    rows = np.concatenate([verts.reshape(n, 24), faces.reshape(n, 36)], axis=1)
+    text = (CUBE_OBJ_TEMPLATE * n) % tuple(rows.ravel().tolist())
+    path = Path(path)
+    if path.exists() and path.read_text() == text:
+        return False
+    with open(path, 'w', buffering=1 << 20) as f:
+        f.write(text)
+    return True
+
 def create_cube_obj(path, center, size):
-    half = size / 2
-    cx, cy, cz = center
-    verts = [
-        (cx-half, cy-half, cz-half), (cx+half, cy-half, cz-half),
-        (cx+half, cy+half, cz-half), (cx-half, cy+half, cz-half),
-        (cx-half, cy-half, cz+half), (cx+half, cy-half, cz+half),
-        (cx+half, cy+half, cz+half), (cx-half, cy+half, cz+half)
-    ]
-    faces = [
-        (1,3,2), (1,4,3), (5,6,7), (5,7,8),
-        (1,2,6), (1,6,5), (2,3,7), (2,7,6),
-        (3,4,8), (3,8,7), (4,1,5), (4,5,8)
-    ]
-    with open(path, 'w') as f:
-        f.write("o cube\n")
-        for v in verts:
-            f.write(f"v {v[0]} {v[1]} {v[2]}\n")
-        for face in faces:
-            f.write(f"f {face[0]} {face[1]} {face[2]}\n")
+    """Write a single cube as OBJ (see create_cubes_obj)."""
+    return create_cubes_obj(path, [center], [size])
+
+def prepare_cubes(cubes):
+    """Create every cube and preprocess, in one batch, those whose .pre is missing or stale.
+
+    cubes: {path: (center, size)}
+    """
+    written = {str(path): create_cube_obj(path, center, size) for path, (center, size) in cubes.items()}
+    changed = [(path, path) for path, was_written in written.items() if was_written]
+    unchanged = [(path, path) for path, was_written in written.items() if not was_written]
+    adapter.preprocess_many(changed, force=True, max_parallel=len(written))
+    adapter.preprocess_many(unchanged, max_parallel=len(written))
 
 TEST_DIR = Path("test_debug")
 TEST_DIR.mkdir(exist_ok=True)
@@ -35,29 +63,22 @@ TIMINGS_DIR.mkdir(exist_ok=True)
 
 adapter = RaytracerAdapter(str(RAYSPACE_DIR), mode="exact", preprocessed_dir=str(PREPROCESSED_DIR), timings_dir=str(TIMINGS_DIR))
 
-# Case 1: Intersecting
 f1 = TEST_DIR / "cube1.obj"
 f2 = TEST_DIR / "cube2.obj"
-create_cube_obj(f1, (10, 10, 10), 4) # [8, 12]
-create_cube_obj(f2, (11, 11, 11), 4) # [9, 13] -> Overlap in 8-12 and 9-13 is 9-12 (Length 3)
-
-# Preprocess
-adapter.preprocess_from_source(str(f1), str(f1))
-adapter.preprocess_from_source(str(f2), str(f2))
-
-res = adapter.run_overlap(str(f1), str(f2), 1)
-print(f"Case 1 (Overlap): Intersections = {res.get('num_intersections')}")
-
-# Case 2: No Overlap
 f3 = TEST_DIR / "cube3.obj"
-create_cube_obj(f3, (20, 20, 20), 4) # [18, 22]
-adapter.preprocess_from_source(str(f3), str(f3))
-res = adapter.run_overlap(str(f1), str(f3), 1)
-print(f"Case 2 (Separate): Intersections = {res.get('num_intersections')}")
-
-# Case 3: Containment (Cube 4 inside Cube 1)
 f4 = TEST_DIR / "cube4.obj"
-create_cube_obj(f4, (10, 10, 10), 2) # [9, 11] subset of [8, 12]
-adapter.preprocess_from_source(str(f4), str(f4))
-res = adapter.run_overlap(str(f1), str(f4), 1)
-print(f"Case 3 (Containment): Intersections = {res.get('num_intersections')}")
+prepare_cubes({
+    f1: ((10, 10, 10), 4), # [8, 12]
+    f2: ((11, 11, 11), 4), # [9, 13] -> Overlap in 8-12 and 9-13 is 9-12 (Length 3)
+    f3: ((20, 20, 20), 4), # [18, 22]
+    f4: ((10, 10, 10), 2), # [9, 11] subset of [8, 12]
+})
+
+cases = [
+    ("Overlap", f1, f2),     # Case 1: Intersecting
+    ("Separate", f1, f3),    # Case 2: No Overlap
+    ("Containment", f1, f4), # Case 3: Containment (Cube 4 inside Cube 1)
+]
+for i, (name, a, b) in enumerate(cases, 1):
+    res = adapter.run_overlap(str(a), str(b), 1)
+    print(f"Case {i} ({name}): Intersections = {res.get('num_intersections')}")
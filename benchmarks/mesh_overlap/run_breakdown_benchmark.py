@@ -1,6 +1,4 @@
 #!/usr/bin/env python3
-import matplotlib.pyplot as plt
-import numpy as np
 import argparse
 from pathlib import Path
 from datetime import datetime
@@ -16,6 +14,7 @@ PREPROCESSED_DIR = DATA_DIR / "preprocessed"
 TIMINGS_DIR = DATA_DIR / "timings"
 FIGURES_DIR = SCRIPT_DIR / "figures"
 RUNS_DIR = SCRIPT_DIR / "runs"
+RUN_LOGS_DIR = RUNS_DIR / "logs"
 
 # Dataset (names provided by user + extensions from benchmark.py)
 FILE1 = "nu400_n_nv150_nu400_vs100_r30.dt"
@@ -27,13 +26,14 @@ def run_experiment(runs, grid_resolution):
     # Setup Logging
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     run_name = f"breakdown_{runs}runs_{timestamp}"
-    run_log_dir = RUNS_DIR / "logs" / run_name
+    run_log_dir = RUN_LOGS_DIR / run_name
     run_log_dir.mkdir(parents=True, exist_ok=True)
     print(f"Logging runs to: {run_log_dir}")
 
-    # Initialize Adapters
-    print("Initializing adapters...")
-    exact_adapter = RaytracerAdapter(
+    # Initialize Adapter (one instance serves both modes via set_mode, sharing the
+    # preprocessed-file cache)
+    print("Initializing adapter...")
+    adapter = RaytracerAdapter(
         str(RAYSPACE_DIR), 
         mode="exact", 
         preprocessed_dir=str(PREPROCESSED_DIR), 
@@ -42,15 +42,6 @@ def run_experiment(runs, grid_resolution):
         warmup_runs=1
     )
     
-    estimated_adapter = RaytracerAdapter(
-        str(RAYSPACE_DIR), 
-        mode="estimated", 
-        preprocessed_dir=str(PREPROCESSED_DIR), 
-        timings_dir=str(TIMINGS_DIR),
-        grid_resolution=grid_resolution,
-        warmup_runs=1
-    )
-    
     # Ensure raw files exist
     f1_path = RAW_DIR / FILE1
     f2_path = RAW_DIR / FILE2
@@ -62,26 +53,25 @@ def run_experiment(runs, grid_resolution):
         print(f"Error: {f2_path} does not exist.")
         return
 
+    # String forms of the paths, converted once for all adapter calls below
+    f1_s, f2_s, log_s = str(f1_path), str(f2_path), str(run_log_dir)
+
     # Check/Run Preprocessing
     print("Checking preprocessing...")
     # Log preprocessing to same dir, or a shared one? 
     # Usually preprocessing is one-off, but we can log it to the run dir for completeness if it happens.
-    for f in [f1_path, f2_path]:
-        if not exact_adapter.check_preprocessed(str(f)):
-            print(f"Preprocessing {f.name}...")
-            exact_adapter.preprocess_from_source(str(f), str(f), log_dir=str(run_log_dir))
-        else:
-            print(f"Already preprocessed: {f.name}")
+    adapter.preprocess_many([(f, f) for f in [f1_s, f2_s]], log_dir=log_s)
 
     # Run Benchmark
     results = {}
     
     print(f"\nRunning Exact Mode ({runs} runs)...")
-    res_exact = exact_adapter.run_overlap(
-        str(f1_path), 
-        str(f2_path), 
+    adapter.set_mode("exact")
+    res_exact = adapter.run_overlap(
+        f1_s, 
+        f2_s, 
         runs,
-        log_dir=str(run_log_dir)
+        log_dir=log_s
     )
     if "error" in res_exact:
         print(f"Error in exact run: {res_exact['error']}")
@@ -89,11 +79,12 @@ def run_experiment(runs, grid_resolution):
     results["Exact"] = res_exact
     
     print(f"\nRunning Estimated Mode ({runs} runs)...")
-    res_est = estimated_adapter.run_overlap(
-        str(f1_path), 
-        str(f2_path), 
+    adapter.set_mode("estimated")
+    res_est = adapter.run_overlap(
+        f1_s, 
+        f2_s, 
         runs,
-        log_dir=str(run_log_dir)
+        log_dir=log_s
     )
     if "error" in res_est:
         print(f"Error in estimated run: {res_est['error']}")
@@ -103,6 +94,10 @@ def run_experiment(runs, grid_resolution):
     return results
 
 def plot_results(results):
+    # Plotting-only dependencies: imported here so --no-plot runs never load them
+    import matplotlib.pyplot as plt
+    import numpy as np
+    
     print("\nPlotting results...")
     FIGURES_DIR.mkdir(parents=True, exist_ok=True)
     
@@ -149,8 +144,6 @@ def plot_results(results):
     bar_width = 0.5
     indices = np.arange(len(modes))
     
-    bottoms = np.zeros(len(modes))
-    
     colors = {
         "selectivity estimation_": "#ff9999", # Red-ish
         "query_": "#66b3ff",              # Blue-ish
@@ -159,22 +152,17 @@ def plot_results(results):
         "download results_": "#ffcc99"      # Orange-ish
     }
     
+    # (n_phases, n_modes) durations; each phase is stacked on the cumulative sum of the
+    # phases below it
+    values = np.array([[results[mode]["breakdown"].get(phase, 0.0) for mode in modes]
+                       for phase in active_phases]).reshape(len(active_phases), len(modes))
+    bottoms = np.zeros_like(values)
+    np.cumsum(values[:-1], axis=0, out=bottoms[1:])
+    
     # Plot bars
-    for phase in active_phases:
-        values = []
-        for mode in modes:
-            val = results[mode]["breakdown"].get(phase, 0.0)
-            values.append(val)
-        
+    for phase, row, bottom in zip(active_phases, values, bottoms):
         label = phase_mapping.get(phase, phase.replace("_", " ").strip().title())
-        color = colors.get(phase, None)
-        
-        # If value is very small but not zero, force a minimum visualization height?
-        # Or print it.
-        # Here we just plot.
-        
-        ax.bar(indices, values, bar_width, bottom=bottoms, label=label, color=color, edgecolor='white')
-        bottoms += np.array(values)
+        ax.bar(indices, row, bar_width, bottom=bottom, label=label, color=colors.get(phase), edgecolor='white')
     
     ax.set_xlabel('Method')
     ax.set_ylabel('Time (ms)')
@@ -192,6 +180,7 @@ def main():
     parser = argparse.ArgumentParser(description="Mesh Overlap Breakdown Experiment")
     parser.add_argument("--runs", type=int, default=5, help="Number of runs per method")
     parser.add_argument("--grid-resolution", type=int, default=10, help="Grid resolution for RaySpace")
+    parser.add_argument("--no-plot", action="store_true", help="Skip plotting the results")
     args = parser.parse_args()
     
     results = run_experiment(args.runs, args.grid_resolution)
@@ -204,7 +193,8 @@ def main():
             for k, v in data['breakdown'].items():
                 print(f"    {k}: {v:.2f} ms")
                 
-        plot_results(results)
+        if not args.no_plot:
+            plot_results(results)
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,4 @@
 #!/usr/bin/env python3
-import matplotlib.pyplot as plt
-import numpy as np
 import argparse
 from pathlib import Path
 from datetime import datetime
@@ -17,27 +15,26 @@ PREPROCESSED_DIR = DATA_DIR / "preprocessed"
 TIMINGS_DIR = DATA_DIR / "timings"
 FIGURES_DIR = SCRIPT_DIR / "figures"
 RUNS_DIR = SCRIPT_DIR / "runs"
+RUN_LOGS_DIR = RUNS_DIR / "logs"
 
 # Cube Counts for Dataset B (Dataset A is fixed at 200k)
 CUBE_COUNTS = [200000, 400000, 600000, 1000000]
 FIXED_COUNT = "200k_a"
 
-def run_experiment(runs, grid_resolution):
+def run_experiment(runs, grid_resolution, preprocess_jobs=1):
     print("--- Starting Cube Scalability Experiment ---")
     
-    # Ensure directories exist
-    RUNS_DIR.mkdir(parents=True, exist_ok=True)
-    
     # Setup Logging
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     run_name = f"cube_scalability_{runs}runs_{timestamp}"
-    run_log_dir = RUNS_DIR / "logs" / run_name
+    run_log_dir = RUN_LOGS_DIR / run_name
     run_log_dir.mkdir(parents=True, exist_ok=True)
     print(f"Logging runs to: {run_log_dir}")
 
-    # Initialize Adapters
-    print("Initializing adapters...")
-    exact_adapter = RaytracerAdapter(
+    # Initialize Adapter (one instance serves both modes via set_mode, sharing the
+    # preprocessed-file cache)
+    print("Initializing adapter...")
+    adapter = RaytracerAdapter(
         str(RAYSPACE_DIR), 
         mode="exact", 
         preprocessed_dir=str(PREPROCESSED_DIR), 
@@ -46,15 +43,6 @@ def run_experiment(runs, grid_resolution):
         warmup_runs=1
     )
     
-    estimated_adapter = RaytracerAdapter(
-        str(RAYSPACE_DIR), 
-        mode="estimated", 
-        preprocessed_dir=str(PREPROCESSED_DIR), 
-        timings_dir=str(TIMINGS_DIR),
-        grid_resolution=grid_resolution,
-        warmup_runs=1
-    )
-    
     results = {
         "counts": [],
         "exact_times": [],
@@ -70,36 +58,45 @@ def run_experiment(runs, grid_resolution):
         print(f"Error: Dataset A ({f1_path}) not found!")
         return
 
+    # Datasets B that exist, in CUBE_COUNTS order
+    b_paths = {}
     for count in CUBE_COUNTS:
-        filename_b = f"cubes_{count // 1000}k_b.obj"
-        f2_path = RAW_DIR / filename_b
-        
+        f2_path = RAW_DIR / f"cubes_{count // 1000}k_b.obj"
         if not f2_path.exists():
             print(f"Error: Dataset B ({f2_path}) not found! Skipping.")
             continue
-        
-        print(f"\nProcessing: {filename_a} vs {filename_b}")
-
-        # Check/Run Preprocessing
-        print("Checking preprocessing...")
-        for f in [f1_path, f2_path]:
-            # Use suffix .pre for checking, but adapter handles naming.
-            # We want to make sure we don't keep reprocessing if not needed.
-            # The adapter uses .with_suffix('.pre')
-            if not exact_adapter.check_preprocessed(str(f)):
-                print(f"Preprocessing {f.name}...")
-                # Note: We name the output .pre file based on the original .obj name
-                exact_adapter.preprocess_from_source(str(f), str(f), log_dir=str(run_log_dir))
-            else:
-                 print(f"Already preprocessed: {f.name}")
+        b_paths[count] = f2_path
+
+    # Loop-invariant string forms of the paths passed to the adapter
+    f1_s = str(f1_path)
+    log_s = str(run_log_dir)
+    b_strs = {count: str(path) for count, path in b_paths.items()}
+
+    # Check/Run Preprocessing for every dataset up front (Dataset A only once). Datasets
+    # are independent, so --preprocess-jobs > 1 preprocesses them in parallel (output is
+    # then printed per dataset); the benchmark runs below stay serial to keep them from
+    # contending for the GPU.
+    # Note: We name the output .pre file based on the original .obj name
+    print("Checking preprocessing...")
+    adapter.preprocess_many(
+        [(f, f) for f in [f1_s, *b_strs.values()]],
+        log_dir=log_s,
+        stream=preprocess_jobs <= 1,
+        max_parallel=preprocess_jobs,
+    )
+
+    for count, f2_path in b_paths.items():
+        print(f"\nProcessing: {filename_a} vs {f2_path.name}")
+        f2_s = b_strs[count]
 
         # Run Exact Benchmark
         print(f"Running Exact Mode ({runs} runs)...")
-        res_exact = exact_adapter.run_overlap(
-            str(f1_path), 
-            str(f2_path), 
+        adapter.set_mode("exact")
+        res_exact = adapter.run_overlap(
+            f1_s, 
+            f2_s, 
             runs,
-            log_dir=str(run_log_dir)
+            log_dir=log_s
         )
         if "error" in res_exact:
             print(f"Error in exact run: {res_exact['error']}")
@@ -107,11 +104,12 @@ def run_experiment(runs, grid_resolution):
             
         # Run Estimated Benchmark
         print(f"Running Estimated Mode ({runs} runs)...")
-        res_est = estimated_adapter.run_overlap(
-            str(f1_path), 
-            str(f2_path), 
+        adapter.set_mode("estimated")
+        res_est = adapter.run_overlap(
+            f1_s, 
+            f2_s, 
             runs,
-            log_dir=str(run_log_dir)
+            log_dir=log_s
         )
         if "error" in res_est:
             print(f"Error in estimated run: {res_est['error']}")
@@ -128,23 +126,31 @@ def run_experiment(runs, grid_resolution):
     return results
 
 def plot_results(results):
+    # Plotting-only dependencies: imported here so --no-plot runs never load them
+    import matplotlib.pyplot as plt
+    import numpy as np
+    from matplotlib.ticker import MaxNLocator, FuncFormatter
+    
     print("\nPlotting results...")
     FIGURES_DIR.mkdir(parents=True, exist_ok=True)
     
-    counts = results["counts"]
-    exact_times = results["exact_times"]
-    estimated_times = results["estimated_times"]
-    exact_std = results["exact_std"]
-    estimated_std = results["estimated_std"]
-    
-    if not counts:
+    if not results["counts"]:
         print("No results to plot.")
         return
 
+    counts = np.asarray(results["counts"])
+    exact_times = np.asarray(results["exact_times"])
+    estimated_times = np.asarray(results["estimated_times"])
+    exact_std = np.asarray(results["exact_std"])
+    estimated_std = np.asarray(results["estimated_std"])
+
     plt.figure(figsize=(10, 6))
     
-    plt.errorbar(counts, exact_times, yerr=exact_std, fmt='-o', label='Exact', capsize=5)
-    plt.errorbar(counts, estimated_times, yerr=estimated_std, fmt='-o', label='Estimated', capsize=5)
+    # Mean line with a shaded +/- 1 std band
+    for times, std, label in ((exact_times, exact_std, 'Exact'),
+                              (estimated_times, estimated_std, 'Estimated')):
+        line, = plt.plot(counts, times, '-o', label=label)
+        plt.fill_between(counts, times - std, times + std, color=line.get_color(), alpha=0.2)
     
     plt.xlabel('Number of Cubes in Dataset B (Dataset A fixed at 200k)')
     plt.ylabel('Execution Time (ms)')
@@ -152,8 +158,10 @@ def plot_results(results):
     plt.legend()
     plt.grid(True)
     
-    # Set x-axis ticks
-    plt.xticks(counts)
+    # Set x-axis ticks: a bounded number of integer ticks, labelled in thousands
+    ax = plt.gca()
+    ax.xaxis.set_major_locator(MaxNLocator(nbins=min(8, len(counts)), integer=True))
+    ax.xaxis.set_major_formatter(FuncFormatter(lambda x, _: f"{x / 1000:g}k"))
     
     output_path = FIGURES_DIR / "mesh_overlap_cube_scalability.png"
     plt.tight_layout()
@@ -164,9 +172,12 @@ def main():
     parser = argparse.ArgumentParser(description="Mesh Overlap Cube Scalability Experiment")
     parser.add_argument("--runs", type=int, default=5, help="Number of runs per method")
     parser.add_argument("--grid-resolution", type=int, default=10, help="Grid resolution for RaySpace")
+    parser.add_argument("--no-plot", action="store_true", help="Skip plotting the results")
+    parser.add_argument("--preprocess-jobs", type=int, default=1,
+                        help="Datasets to preprocess concurrently (default: 1)")
     args = parser.parse_args()
     
-    results = run_experiment(args.runs, args.grid_resolution)
+    results = run_experiment(args.runs, args.grid_resolution, args.preprocess_jobs)
     
     if results and results["counts"]:
         print("\nResults Summary:")
@@ -174,7 +185,8 @@ def main():
         for i, n in enumerate(results["counts"]):
             print(f"{n:<10} {results['exact_times'][i]:<15.2f} {results['estimated_times'][i]:<15.2f}")
                 
-        plot_results(results)
+        if not args.no_plot:
+            plot_results(results)
     else:
         print("No successful runs.")
 
@@ -4,11 +4,16 @@ import sys
 import json
 import argparse
 from pathlib import Path
-import subprocess
 
 # Add current directory to path to import adapters
 sys.path.append(str(Path(__file__).parent))
 from adapters.raytracer_adapter import RaytracerAdapter
+from adapters.base import run_commands_concurrently
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configuration
 SELECTIVITIES = [0.0001, 0.0005, 0.001, 0.005, 0.01]
@@ -34,6 +39,11 @@ def compute_universe_for_selectivity(target_selectivity, min_size, max_size):
     universe_extent = (2.0 * avg_size) / (target_selectivity ** (1.0/3.0))
     return universe_extent
 
+def cube_files(selectivity):
+    """Paths of the generated cube datasets A and B for one selectivity."""
+    file_suffix = str(selectivity).replace('.', '_')
+    return RAW_DIR / f"cubes_a_sel_{file_suffix}.obj", RAW_DIR / f"cubes_b_sel_{file_suffix}.obj"
+
 def main():
     RAW_DIR.mkdir(parents=True, exist_ok=True)
     PREPROCESSED_DIR.mkdir(parents=True, exist_ok=True)
@@ -42,6 +52,31 @@ def main():
 
     summary_results = []
 
+    # Every selectivity writes its own pair of files, so generate all missing pairs up
+    # front, concurrently, instead of paying one generator startup after another.
+    gen_cmds = []
+    for selectivity in SELECTIVITIES:
+        obj_a, obj_b = cube_files(selectivity)
+        if not obj_a.exists() or not obj_b.exists():
+            gen_cmds.append([
+                "python3", str(GENERATOR_SCRIPT),
+                "--num-cubes-a", str(NUM_CUBES),
+                "--num-cubes-b", str(NUM_CUBES),
+                "--min-size", str(MIN_SIZE),
+                "--max-size", str(MAX_SIZE),
+                "--selectivity", str(selectivity),
+                "--output-a", str(obj_a),
+                "--output-b", str(obj_b),
+                "--seed", "42"
+            ])
+    if gen_cmds:
+        print(f"Generating cubes for {len(gen_cmds)} selectivities...")
+        for result in run_commands_concurrently(gen_cmds, max_parallel=min(len(gen_cmds), os.cpu_count() or 1)):
+            if isinstance(result, BaseException):
+                raise result
+    else:
+        print("Cube files already exist, skipping generation.")
+
     for selectivity in SELECTIVITIES:
         print(f"\n{'='*60}")
         print(f"Processing Selectivity: {selectivity}")
@@ -55,32 +90,13 @@ def main():
         print(f"Universe Extent: {universe_extent:.2f}")
         print(f"Grid Resolution: {grid_resolution} (Cell Size: {universe_extent/grid_resolution:.2f})")
 
-        # 2. Generate Data
-        file_suffix = str(selectivity).replace('.', '_')
-        obj_a = RAW_DIR / f"cubes_a_sel_{file_suffix}.obj"
-        obj_b = RAW_DIR / f"cubes_b_sel_{file_suffix}.obj"
+        # 2. Data (generated above)
+        obj_a, obj_b = cube_files(selectivity)
         
         # .dt paths for consistent naming in adapter
         dt_a = obj_a.with_suffix('.dt') 
         dt_b = obj_b.with_suffix('.dt')
 
-        if not obj_a.exists() or not obj_b.exists():
-            print("Generating cubes...")
-            cmd = [
-                "python3", str(GENERATOR_SCRIPT),
-                "--num-cubes-a", str(NUM_CUBES),
-                "--num-cubes-b", str(NUM_CUBES),
-                "--min-size", str(MIN_SIZE),
-                "--max-size", str(MAX_SIZE),
-                "--selectivity", str(selectivity),
-                "--output-a", str(obj_a),
-                "--output-b", str(obj_b),
-                "--seed", "42"
-            ]
-            subprocess.run(cmd, check=True)
-        else:
-            print("Files already exist, skipping generation.")
-
         # 3. Setup Adapter
         adapter = RaytracerAdapter(
             str(RAYSPACE_DIR), 
@@ -112,14 +128,8 @@ def main():
         }
         
         for mode in modes:
-            adapter.mode = mode
-            # Update executable manually as correct binary depends on mode
-            if mode == "exact":
-                adapter.executable = adapter.rayspace_dir / "query/build/bin/raytracer_mesh_overlap"
-                adapter.name = "Raytracer_exact"
-            elif mode == "estimated":
-                adapter.executable = adapter.rayspace_dir / "query/build/bin/raytracer_overlap_estimated"
-                adapter.name = "Raytracer_estimated"
+            # Switches binary, name and expected timing phases together
+            adapter.set_mode(mode)
                 
             results = adapter.run_overlap(
                 str(obj_a),
@@ -142,8 +152,12 @@ def main():
 
     # Save summary
     summary_path = RESULTS_DIR / "summary.json"
-    with open(summary_path, 'w') as f:
-        json.dump(summary_results, f, indent=4)
+    if orjson is not None:
+        with open(summary_path, 'wb') as f:
+            f.write(orjson.dumps(summary_results, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(summary_path, 'w') as f:
+            json.dump(summary_results, f, indent=4)
     print(f"\nSummary saved to {summary_path}")
 
 if __name__ == "__main__":
@@ -1,22 +1,32 @@
 #!/usr/bin/env python3
 """
 Visualization script for mesh overlap benchmark results.
-Generates bar charts showing mean, min, max, and standard deviation for each adapter.
+Generates a bar chart showing mean, min, max, and standard deviation for each adapter.
 """
 import json
 import argparse
+import matplotlib
+matplotlib.use("Agg")  # files only: skip GUI backend selection
 import matplotlib.pyplot as plt
 import numpy as np
 from pathlib import Path
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 def load_results(json_file):
     """Load benchmark results from JSON file."""
+    if orjson is not None:
+        with open(json_file, 'rb') as f:
+            return orjson.loads(f.read())
     with open(json_file, 'r') as f:
         data = json.load(f)
     return data
 
-def visualize_results(json_file, output_dir=None):
-    """Generate visualization from benchmark results."""
+def visualize_results(json_file, output_dir=None, dpi=150, save_pdf=False):
+    """Generate visualization from benchmark results (PNG, plus PDF if save_pdf)."""
     data = load_results(json_file)
     
     # Extract metadata
@@ -37,61 +47,11 @@ def visualize_results(json_file, output_dir=None):
     
     # Prepare data for plotting
     adapters = list(valid_results.keys())
-    means = [valid_results[name]["mean"] for name in adapters]
-    mins = [valid_results[name]["min"] for name in adapters]
-    maxs = [valid_results[name]["max"] for name in adapters]
-    stds = [valid_results[name]["std"] for name in adapters]
-    
-    # Create figure with two subplots
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
-    
-    # Plot 1: Bar chart with error bars (showing std dev)
-    x_pos = np.arange(len(adapters))
-    bars = ax1.bar(x_pos, means, yerr=stds, capsize=5, alpha=0.7, 
-                   color=['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728'][:len(adapters)])
-    
-    ax1.set_xlabel('Adapter', fontsize=12)
-    ax1.set_ylabel('Query Time (ms) [Log Scale]', fontsize=12)
-    ax1.set_title(f'Mean Query Time with Std Dev\n{dataset} ({num_runs} runs)', fontsize=14, fontweight='bold')
-    ax1.set_yscale('log')
-    ax1.set_xticks(x_pos)
-    ax1.set_xticklabels(adapters, rotation=15, ha='right')
-    ax1.grid(axis='y', which='both', alpha=0.3)
-    
-    # Add value labels on bars
-    for i, (bar, mean, std) in enumerate(zip(bars, means, stds)):
-        height = bar.get_height()
-        # Offset label slightly in log space
-        ax1.text(bar.get_x() + bar.get_width()/2., height * 1.05,
-                f'{mean:.2f} ms',
-                ha='center', va='bottom', fontsize=9)
-    
-    # Plot 2: Min/Max range visualization
-    width = 0.6
-    for i, adapter in enumerate(adapters):
-        min_val = mins[i]
-        max_val = maxs[i]
-        mean_val = means[i]
-        
-        # Draw range line
-        ax2.plot([i, i], [min_val, max_val], 'k-', linewidth=2, alpha=0.5)
-        # Draw min marker
-        ax2.plot(i, min_val, 'v', markersize=8, color='blue', label='Min' if i == 0 else '')
-        # Draw max marker
-        ax2.plot(i, max_val, '^', markersize=8, color='red', label='Max' if i == 0 else '')
-        # Draw mean marker
-        ax2.plot(i, mean_val, 'o', markersize=10, color='green', label='Mean' if i == 0 else '')
-    
-    ax2.set_xlabel('Adapter', fontsize=12)
-    ax2.set_ylabel('Query Time (ms) [Log Scale]', fontsize=12)
-    ax2.set_title(f'Min/Max/Mean Comparison\n{dataset} ({num_runs} runs)', fontsize=14, fontweight='bold')
-    ax2.set_yscale('log')
-    ax2.set_xticks(range(len(adapters)))
-    ax2.set_xticklabels(adapters, rotation=15, ha='right')
-    ax2.grid(axis='y', which='both', alpha=0.3)
-    ax2.legend(loc='best')
-    
-    plt.tight_layout()
+    # One pass over the results: rows are adapters, columns mean/min/max/std
+    stats = np.array([[res["mean"], res["min"], res["max"], res["std"]] for res in valid_results.values()])
+    means, mins, maxs, stds = stats.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cvs = stds / means * 100  # Coefficient of variation
     
     # Determine output path
     if output_dir is None:
@@ -101,41 +61,77 @@ def visualize_results(json_file, output_dir=None):
     output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    # Save figure
     output_name = f"{dataset}_{num_runs}runs_{timestamp}.png"
     output_path = output_dir / output_name
-    plt.savefig(output_path, dpi=300, bbox_inches='tight')
-    print(f"Figure saved to {output_path}")
     
-    # Also save as PDF for publications
-    output_path_pdf = output_dir / f"{dataset}_{num_runs}runs_{timestamp}.pdf"
-    plt.savefig(output_path_pdf, bbox_inches='tight')
-    print(f"PDF saved to {output_path_pdf}")
-    
-    plt.close()
+    with plt.style.context("fast"):
+        # Single axes: mean bars with std dev error bars, min/max range overlaid
+        fig, ax1 = plt.subplots(figsize=(9, 6))
+        
+        x_pos = np.arange(len(adapters))
+        bars = ax1.bar(x_pos, means, yerr=stds, capsize=5, alpha=0.7, 
+                       color=['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728'][:len(adapters)])
+        
+        # Min/Max range per adapter, drawn inside the bar's right edge to stay clear of
+        # the std dev error bar and value label
+        range_x = x_pos + 0.3
+        ax1.vlines(range_x, mins, maxs, color='k', linewidth=2, alpha=0.4)
+        ax1.scatter(range_x, mins, marker='v', s=64, color='blue', label='Min', zorder=3)
+        ax1.scatter(range_x, maxs, marker='^', s=64, color='red', label='Max', zorder=3)
+        
+        ax1.set_xlabel('Adapter', fontsize=12)
+        ax1.set_ylabel('Query Time (ms) [Log Scale]', fontsize=12)
+        ax1.set_title(f'Mean Query Time with Std Dev and Min/Max\n{dataset} ({num_runs} runs)', fontsize=14, fontweight='bold')
+        ax1.set_yscale('log')
+        ax1.set_xticks(x_pos)
+        ax1.set_xticklabels(adapters, rotation=15, ha='right')
+        ax1.grid(axis='y', which='both', alpha=0.3)
+        ax1.legend(loc='best')
+        
+        # Value labels above each bar's std dev error bar; the padding is in points, so
+        # the offset looks the same on the log scale regardless of bar height
+        ax1.bar_label(bars, labels=[f'{mean:.2f} ms' for mean in means], padding=3, fontsize=9)
+        
+        plt.tight_layout()
+        
+        # Save figure
+        fig.savefig(output_path, dpi=dpi, bbox_inches='tight', pil_kwargs={"optimize": True})
+        print(f"Figure saved to {output_path}")
+        
+        if save_pdf:
+            # PDF for publications
+            output_path_pdf = output_dir / f"{dataset}_{num_runs}runs_{timestamp}.pdf"
+            fig.savefig(output_path_pdf, bbox_inches='tight')
+            print(f"PDF saved to {output_path_pdf}")
+        
+        # Release the figure so batch use over many JSONs keeps memory bounded
+        fig.clear()
+        plt.close(fig)
     
     # Print summary statistics
     print("\n" + "="*60)
     print(f"Benchmark Results Summary: {dataset}")
     print("="*60)
-    for adapter in adapters:
-        res = valid_results[adapter]
+    for adapter, (mean, min_, max_, std), cv in zip(adapters, stats, cvs):
         print(f"\n{adapter}:")
-        print(f"  Mean:   {res['mean']:.4f} ms")
-        print(f"  Min:    {res['min']:.4f} ms")
-        print(f"  Max:    {res['max']:.4f} ms")
-        print(f"  Std:    {res['std']:.4f} ms")
-        print(f"  CV:     {(res['std']/res['mean']*100):.2f}%")  # Coefficient of variation
+        print(f"  Mean:   {mean:.4f} ms")
+        print(f"  Min:    {min_:.4f} ms")
+        print(f"  Max:    {max_:.4f} ms")
+        print(f"  Std:    {std:.4f} ms")
+        print(f"  CV:     {cv:.2f}%")
 
 def main():
     parser = argparse.ArgumentParser(description="Visualize mesh overlap benchmark results")
-    parser.add_argument("json_file", type=str, help="Path to benchmark results JSON file")
+    parser.add_argument("json_files", type=str, nargs="+", help="Path(s) to benchmark results JSON file(s)")
     parser.add_argument("--output-dir", type=str, default=None, 
                         help="Output directory for figures (default: ../figures relative to JSON)")
+    parser.add_argument("--dpi", type=int, default=150, help="PNG resolution (default: 150)")
+    parser.add_argument("--pdf", action="store_true", help="Also save the figure as PDF")
     
     args = parser.parse_args()
     
-    visualize_results(args.json_file, args.output_dir)
+    for json_file in args.json_files:
+        visualize_results(json_file, args.output_dir, dpi=args.dpi, save_pdf=args.pdf)
 
 if __name__ == "__main__":
     main()
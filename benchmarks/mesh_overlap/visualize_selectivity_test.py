@@ -6,37 +6,32 @@ Reads the summary.json produced by selectivity_test.py and generates visualizati
 import io
 import json
 import argparse
+import matplotlib
+matplotlib.use("Agg")  # files only: skip GUI backend selection
 import matplotlib.pyplot as plt
 import numpy as np
 from pathlib import Path
 
-def visualize_selectivity(summary_file, output_path=None):
+def visualize_selectivity(summary_file, output_path=None, save_pdf=False):
+    """Plot query time vs. selectivity (PNG, plus PDF if save_pdf)."""
     with open(summary_file, 'r') as f:
         data = json.load(f)
 
     # Sort checks if json is not sorted
     data.sort(key=lambda x: x["selectivity"])
 
-    selectivities = [d["selectivity"] for d in data]
-    exact_means = []
-    exact_stds = []
-    est_means = []
-    est_stds = []
-
-    # Filter data
-    valid_selectivities = []
-    for d in data:
-        if "error" in d.get("exact", {}) or "error" in d.get("estimated", {}):
-            continue
-        valid_selectivities.append(d["selectivity"])
-        exact_means.append(d["exact"]["mean_ms"])
-        exact_stds.append(d["exact"]["std_ms"])
-        est_means.append(d["estimated"]["mean_ms"])
-        est_stds.append(d["estimated"]["std_ms"])
-
-    if not valid_selectivities:
+    # Filter data: one row per valid point, columns
+    # selectivity, exact mean/std, estimated mean/std
+    valid = [d for d in data if "error" not in d.get("exact", {}) and "error" not in d.get("estimated", {})]
+    if not valid:
         print("No valid data points found.")
         return
+    arr = np.array([
+        (d["selectivity"], d["exact"]["mean_ms"], d["exact"]["std_ms"],
+         d["estimated"]["mean_ms"], d["estimated"]["std_ms"])
+        for d in valid
+    ])
+    valid_selectivities, exact_means, exact_stds, est_means, est_stds = arr.T
 
     # Plot
     fig, ax = plt.subplots(figsize=(10, 6))
@@ -51,11 +46,15 @@ def visualize_selectivity(summary_file, output_path=None):
     # Let's use log scale for X if evenly spaced in log, but user provided [0.0001, 0.0005, 0.001, 0.005, 0.01]
     # These are somewhat log-spaced.
     
-    # Plot lines
-    ax.errorbar(valid_selectivities, exact_means, yerr=exact_stds, label='Exact Raytracer', 
-                marker='o', capsize=5, linestyle='-', color='#1f77b4')
-    ax.errorbar(valid_selectivities, est_means, yerr=est_stds, label='Estimated Raytracer', 
-                marker='s', capsize=5, linestyle='--', color='#2ca02c')
+    # Plot lines with a shaded +/- std dev band
+    ax.plot(valid_selectivities, exact_means, label='Exact Raytracer',
+            marker='o', linestyle='-', color='#1f77b4')
+    ax.fill_between(valid_selectivities, exact_means - exact_stds, exact_means + exact_stds,
+                    color='#1f77b4', alpha=0.2, linewidth=0)
+    ax.plot(valid_selectivities, est_means, label='Estimated Raytracer',
+            marker='s', linestyle='--', color='#2ca02c')
+    ax.fill_between(valid_selectivities, est_means - est_stds, est_means + est_stds,
+                    color='#2ca02c', alpha=0.2, linewidth=0)
 
     ax.set_xscale('log')
     ax.set_yscale('log')
@@ -68,8 +67,8 @@ def visualize_selectivity(summary_file, output_path=None):
     ax.legend(fontsize=12)
 
     # Annotate improvement factor
-    for sl, ex, est in zip(valid_selectivities, exact_means, est_means):
-        speedup = ex / est
+    speedups = exact_means / est_means
+    for sl, est, speedup in zip(valid_selectivities, est_means, speedups):
         ax.annotate(f"{speedup:.1f}x", 
                     xy=(sl, est), 
                     xytext=(0, -15), textcoords="offset points",
@@ -85,19 +84,22 @@ def visualize_selectivity(summary_file, output_path=None):
         output_path = output_dir / img_name
 
     plt.tight_layout()
-    plt.savefig(output_path, dpi=300)
+    plt.savefig(output_path, dpi=300, metadata={"Software": None})
     print(f"Visualization saved to {output_path}")
     
-    # Also save PDF
-    pdf_path = str(output_path).replace('.png', '.pdf')
-    plt.savefig(pdf_path)
-    print(f"PDF saved to {pdf_path}")
+    if save_pdf:
+        # PDF for publications
+        pdf_path = str(output_path).replace('.png', '.pdf')
+        plt.savefig(pdf_path)
+        print(f"PDF saved to {pdf_path}")
+    plt.close(fig)
 
 def main():
     parser = argparse.ArgumentParser(description="Visualize Selectivity Test Results")
     parser.add_argument("summary_file", nargs='?', default="results/selectivity_test/summary.json",
                         help="Path to summary.json")
     parser.add_argument("--output", help="Path to output image")
+    parser.add_argument("--pdf", action="store_true", help="Also save the figure as PDF")
     
     args = parser.parse_args()
     
@@ -111,7 +113,7 @@ def main():
         print(f"Error: Summary file {input_file} not found.")
         return
 
-    visualize_selectivity(input_file, args.output)
+    visualize_selectivity(input_file, args.output, save_pdf=args.pdf)
 
 if __name__ == "__main__":
     main()
@@ -2,18 +2,44 @@
 
 import os
 from abc import ABC, abstractmethod
+from pathlib import Path
 from typing import Dict, Tuple, Any
 
 import numpy as np
 
+from .mesh_cache import shared_workspace
+
 
 class SpatialQueryAdapter(ABC):
     """Base class for spatial query approach adapters."""
     
     def __init__(self, name: str, workspace: str):
         self.name = name
+        # Created on first use (see _ensure_workspace), not here
         self.workspace = workspace
-        os.makedirs(workspace, exist_ok=True)
+        self._ws = Path(workspace)
+        self._ws_ready = False
+        # Translated meshes are shared by all adapters whose workspaces have the same parent
+        self.mesh_cache_dir = shared_workspace(os.path.dirname(os.path.abspath(workspace)))
+    
+    @property
+    def supports_parallel(self) -> bool:
+        """Whether queries for different grid cells may run in concurrent processes.
+        
+        Only approaches that neither share a GPU nor a database qualify.
+        """
+        return False
+    
+    @property
+    def uses_translated_mesh(self) -> bool:
+        """Whether execute_query reads a translated copy of the query mesh."""
+        return True
+    
+    def _ensure_workspace(self):
+        """Create the workspace directory the first time an adapter writes to it."""
+        if not self._ws_ready:
+            os.makedirs(self.workspace, exist_ok=True)
+            self._ws_ready = True
     
     @abstractmethod
     def setup(self, **kwargs) -> bool:
@@ -1,6 +1,5 @@
 """CGAL baseline adapter."""
 
-import os
 import re
 import subprocess
 from pathlib import Path
@@ -9,7 +8,16 @@ from typing import Dict, Tuple, Any
 import numpy as np
 
 from .base import SpatialQueryAdapter
-from .utils import translate_obj, run_subprocess_streaming
+from .mesh_cache import get_translated_obj, release
+from .utils import conda_env, run_subprocess_streaming
+
+
+# Result lines printed by cgal_query, matched in a single scan over its stdout
+_CGAL_RE = re.compile(
+    r'CONTAINMENT QUERY TIME:\s*(?P<time>[0-9.]+)\s*ms'
+    r'|Points inside mesh:\s*(?P<inside>\d+)'
+    r'|Total points:\s*(?P<total>\d+)'
+)
 
 
 class CGALAdapter(SpatialQueryAdapter):
@@ -19,11 +27,19 @@ class CGALAdapter(SpatialQueryAdapter):
         super().__init__("CGAL", workspace)
         self.cgal_basedir = Path(cgal_basedir)
         self.executable = self.cgal_basedir / "build" / "cgal_query"
+        # Environment of the activated cgal_spatial conda env, captured in setup()
+        self._env = None
+    
+    @property
+    def supports_parallel(self) -> bool:
+        # CPU-only, and each grid cell has its own translated mesh
+        return True
     
     def setup(self, **kwargs) -> bool:
         """Build CGAL executable if needed."""
         if self.executable.exists():
             print(f"[CGAL] Executable already exists: {self.executable}")
+            self._env = conda_env("cgal_spatial", prefix="[CGAL]")
             return True
         
         print(f"[CGAL] Building...")
@@ -40,10 +56,14 @@ class CGALAdapter(SpatialQueryAdapter):
                  f"conda activate cgal_spatial && "
                  f"cd {self.cgal_basedir} && bash {build_script}"],
                 prefix="[CGAL]",
-                check=True
+                check=True,
+                capture_stdout=False
             )
             print(f"[CGAL] Build successful")
-            return self.executable.exists()
+            if not self.executable.exists():
+                return False
+            self._env = conda_env("cgal_spatial", prefix="[CGAL]")
+            return True
         except subprocess.CalledProcessError as e:
             print(f"[CGAL] Build failed: {e.stderr}")
             return False
@@ -57,24 +77,26 @@ class CGALAdapter(SpatialQueryAdapter):
         **kwargs
     ) -> Dict[str, Any]:
         """Execute CGAL query."""
-        # Translate geometry
-        gx, gy, gz = grid_pos
-        translated_obj = os.path.join(self.workspace, f"translated_{gx}_{gy}_{gz}.obj")
-        translate_obj(geometry_path, translated_obj, translation)
+        # Translate geometry (shared, cached translation)
+        translated_obj = get_translated_obj(geometry_path, translation, self.mesh_cache_dir)
         
-        # Run CGAL query with conda environment
-        cmd = f"""
+        # Run CGAL query in the conda environment captured by setup(), or activate it here
+        if self._env is not None:
+            cmd = [str(self.executable), translated_obj, points_path]
+        else:
+            cmd = ["bash", "-c", f"""
 source $(conda info --base)/etc/profile.d/conda.sh
 conda activate cgal_spatial
 {self.executable} {translated_obj} {points_path}
-"""
+"""]
         
         try:
             result, stdout, stderr = run_subprocess_streaming(
-                ["bash", "-c", cmd],
+                cmd,
                 prefix="[CGAL]",
                 timeout=3600,
-                check=True
+                check=True,
+                env=self._env
             )
             
             # Parse stdout for timing and results
@@ -83,20 +105,17 @@ conda activate cgal_spatial
             inside_count = None
             total_points = None
             
-            # Look for "CONTAINMENT QUERY TIME: XXX ms"
-            match = re.search(r'CONTAINMENT QUERY TIME:\s*([0-9.]+)\s*ms', stdout)
-            if match:
-                query_time_ms = float(match.group(1))
-            
-            # Look for "Points inside mesh: XXX"
-            match = re.search(r'Points inside mesh:\s*(\d+)', stdout)
-            if match:
-                inside_count = int(match.group(1))
-            
-            # Look for "Total points: XXX"
-            match = re.search(r'Total points:\s*(\d+)', stdout)
-            if match:
-                total_points = int(match.group(1))
+            # "CONTAINMENT QUERY TIME: XXX ms", "Points inside mesh: XXX", "Total points: XXX"
+            # (first occurrence of each wins)
+            for match in _CGAL_RE.finditer(stdout):
+                if match.group('time') is not None:
+                    if query_time_ms is None:
+                        query_time_ms = float(match.group('time'))
+                elif match.group('inside') is not None:
+                    if inside_count is None:
+                        inside_count = int(match.group('inside'))
+                elif total_points is None:
+                    total_points = int(match.group('total'))
             
             return {
                 'query_ms': query_time_ms,
@@ -114,9 +133,7 @@ conda activate cgal_spatial
         except Exception as e:
             return {'success': False, 'error': str(e)}
         finally:
-            # Cleanup translated file
-            if os.path.exists(translated_obj):
-                os.remove(translated_obj)
+            release(translated_obj)
     
     def cleanup(self):
         """Cleanup workspace."""
@@ -1,7 +1,5 @@
 """CUDA baseline adapter."""
 
-import json
-import os
 import subprocess
 from pathlib import Path
 from typing import Dict, Tuple, Any
@@ -9,7 +7,8 @@ from typing import Dict, Tuple, Any
 import numpy as np
 
 from .base import SpatialQueryAdapter
-from .utils import translate_obj, run_subprocess_streaming
+from .mesh_cache import get_translated_obj, release
+from .utils import run_subprocess_streaming, load_timing_json
 
 
 class CUDAAdapter(SpatialQueryAdapter):
@@ -40,7 +39,8 @@ class CUDAAdapter(SpatialQueryAdapter):
                 ["bash", str(self.build_script)],
                 prefix="[CUDA]",
                 timeout=600,
-                check=True
+                check=True,
+                capture_stdout=False
             )
             
             if not self.executable.exists():
@@ -66,34 +66,34 @@ class CUDAAdapter(SpatialQueryAdapter):
         **kwargs
     ) -> Dict[str, Any]:
         """Execute CUDA query."""
+        self._ensure_workspace()
         gx, gy, gz = grid_pos
         
-        # Translate OBJ
-        translated_obj = os.path.join(self.workspace, f"mesh_{gx}_{gy}_{gz}.obj")
-        translate_obj(geometry_path, translated_obj, translation)
+        # Translate OBJ (shared, cached translation)
+        translated_obj = get_translated_obj(geometry_path, translation, self.mesh_cache_dir)
         
         # Output timing JSON
-        timing_json = os.path.join(self.workspace, f"timing_{gx}_{gy}_{gz}.json")
+        timing_json = self._ws / f"timing_{gx}_{gy}_{gz}.json"
         
         # Run CUDA query executable
         cmd = [
             str(self.executable),
             translated_obj,
             points_path,
-            timing_json
+            str(timing_json)
         ]
         
         try:
-            result, stdout, stderr = run_subprocess_streaming(
+            run_subprocess_streaming(
                 cmd,
                 prefix="[CUDA]",
                 timeout=3600,
-                check=True
+                check=True,
+                capture_stdout=False
             )
             
             # Read timing JSON
-            with open(timing_json, 'r') as f:
-                timing_data = json.load(f)
+            timing_data = load_timing_json(timing_json)
             
             # Extract timings
             phases = timing_data.get('phases', {})
@@ -135,9 +135,11 @@ class CUDAAdapter(SpatialQueryAdapter):
         except subprocess.TimeoutExpired:
             return {'success': False, 'error': 'Timeout'}
         except subprocess.CalledProcessError as e:
-            return {'success': False, 'error': stderr if 'stderr' in locals() else str(e)}
+            return {'success': False, 'error': str(e)}
         except Exception as e:
             return {'success': False, 'error': str(e)}
+        finally:
+            release(translated_obj)
     
     def cleanup(self):
         """Cleanup workspace."""
@@ -1,16 +1,60 @@
 """RaySpace3D Filter-Refine adapter."""
 
-import json
-import os
 import re
+import shutil
 import subprocess
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Tuple, Any
+from typing import Dict, Optional, Tuple, Any
 
 import numpy as np
 
 from .base import SpatialQueryAdapter
-from .utils import translate_obj, run_subprocess_streaming
+from .mesh_cache import get_translated_obj, release, translation_key
+from .utils import link_or_copy, run_subprocess_streaming, load_timing_json
+
+
+# Result count lines printed by raytracer_filter_refine, matched in a single scan
+_COUNTS_RE = re.compile(r'Points INSIDE polygons:\s*(?P<inside>\d+)|Total points:\s*(?P<total>\d+)')
+
+
+@dataclass
+class PhaseTimings:
+    """Phase durations (ms) of one raytracer_filter_refine run, grouped by category."""
+    upload_bbox: float = 0.0
+    upload_geom: float = 0.0
+    upload_points: float = 0.0
+    filter: Optional[float] = None
+    query: Optional[float] = None
+    download: Optional[float] = None
+    
+    @property
+    def upload(self) -> float:
+        return self.upload_bbox + self.upload_geom + self.upload_points
+    
+    @classmethod
+    def from_durations(cls, durations: Dict[str, float]) -> "PhaseTimings":
+        """Classify {lowercased phase key: ms} in a single pass.
+        
+        Uploads are summed per kind; the last filter phase wins; the first
+        non-warmup query and the first download/output phase are kept.
+        """
+        pt = cls()
+        for nk, dur in durations.items():
+            if 'upload' in nk:
+                if 'bbox' in nk:
+                    pt.upload_bbox += dur
+                elif 'geometry' in nk:
+                    pt.upload_geom += dur
+                elif 'points' in nk:
+                    pt.upload_points += dur
+            if 'filter' in nk:
+                pt.filter = dur
+            if pt.query is None and 'query' in nk and 'warmup' not in nk:
+                pt.query = dur
+            if pt.download is None and ('download' in nk or 'output' in nk):
+                pt.download = dur
+        return pt
 
 
 class FilterRefineAdapter(SpatialQueryAdapter):
@@ -21,6 +65,8 @@ class FilterRefineAdapter(SpatialQueryAdapter):
         self.rayspace_dir = Path(rayspace_dir)
         self.executable = self.rayspace_dir / "build" / "bin" / "raytracer_filter_refine"
         self.preprocess_exec = self.rayspace_dir / "build" / "bin" / "preprocess_dataset"
+        # (geometry path, x, y, z) -> (mesh dir, preprocessed geometry, preprocess timing)
+        self._cells: Dict[Tuple, Tuple[Path, Path, Path]] = {}
     
     def setup(self, **kwargs) -> bool:
         """Check executable exists."""
@@ -43,44 +89,57 @@ class FilterRefineAdapter(SpatialQueryAdapter):
         **kwargs
     ) -> Dict[str, Any]:
         """Execute filter-refine query."""
+        self._ensure_workspace()
         gx, gy, gz = grid_pos
         
-        # Translate OBJ and place in its own subdirectory (required by preprocess_dataset)
-        obj_dir = os.path.join(self.workspace, f"mesh_{gx}_{gy}_{gz}")
-        os.makedirs(obj_dir, exist_ok=True)
-        translated_obj = os.path.join(obj_dir, "mesh.obj")
-        translate_obj(geometry_path, translated_obj, translation)
-        
-        # Preprocess
-        preprocessed_geom = os.path.join(self.workspace, f"geom_{gx}_{gy}_{gz}.txt")
-        preprocess_timing = os.path.join(self.workspace, f"preprocess_timing_{gx}_{gy}_{gz}.json")
-        
-        cmd_preprocess = [
-            str(self.preprocess_exec),
-            "--mode", "mesh",
-            "--dataset", obj_dir,
-            "--output-geometry", preprocessed_geom,
-            "--output-timing", preprocess_timing
-        ]
-        
-        try:
-            run_subprocess_streaming(
-                cmd_preprocess,
-                prefix="[FilterRefine]",
-                timeout=600,
-                check=True
-            )
-        except Exception as e:
-            return {'success': False, 'error': f'Preprocessing failed: {str(e)}'}
+        # Translated mesh and preprocessed geometry depend only on the mesh and its
+        # translation, so repeated queries of a cell reuse them; cleanup() removes them.
+        key = (str(geometry_path),) + translation_key(translation)
+        cell = self._cells.get(key)
+        if cell is None:
+            # Translate OBJ and place in its own subdirectory (required by preprocess_dataset)
+            obj_dir = self._ws / f"mesh_{gx}_{gy}_{gz}"
+            obj_dir.mkdir(exist_ok=True)
+            translated_obj = obj_dir / "mesh.obj"
+            shared_obj = get_translated_obj(geometry_path, translation, self.mesh_cache_dir)
+            link_or_copy(shared_obj, translated_obj)
+            release(shared_obj)
+            
+            # Preprocess
+            preprocessed_geom = self._ws / f"geom_{gx}_{gy}_{gz}.txt"
+            preprocess_timing = self._ws / f"preprocess_timing_{gx}_{gy}_{gz}.json"
+            
+            cmd_preprocess = [
+                str(self.preprocess_exec),
+                "--mode", "mesh",
+                "--dataset", str(obj_dir),
+                "--output-geometry", str(preprocessed_geom),
+                "--output-timing", str(preprocess_timing)
+            ]
+            
+            try:
+                run_subprocess_streaming(
+                    cmd_preprocess,
+                    prefix="[FilterRefine]",
+                    timeout=600,
+                    check=True,
+                    capture_stdout=False
+                )
+            except Exception as e:
+                shutil.rmtree(obj_dir, ignore_errors=True)
+                return {'success': False, 'error': f'Preprocessing failed: {str(e)}'}
+            
+            cell = self._cells[key] = (obj_dir, preprocessed_geom, preprocess_timing)
+        preprocessed_geom = cell[1]
         
         # Run filter-refine
-        timing_json = os.path.join(self.workspace, f"timing_fr_{gx}_{gy}_{gz}.json")
+        timing_json = self._ws / f"timing_fr_{gx}_{gy}_{gz}.json"
         
         cmd_raytrace = [
             str(self.executable),
-            "--geometry", preprocessed_geom,
+            "--geometry", str(preprocessed_geom),
             "--points", points_path,
-            "--output", timing_json,
+            "--output", str(timing_json),
             "--no-export"
         ]
         
@@ -93,122 +152,61 @@ class FilterRefineAdapter(SpatialQueryAdapter):
             )
             
             # Read timing JSON
-            with open(timing_json, 'r') as f:
-                timing_data = json.load(f)
+            timing_data = load_timing_json(timing_json)
             
             # Extract timings robustly (keys may be lowercase and have suffixes like "_1")
             phases = timing_data.get('phases', {})
 
-            # Initialize accumulators
-            upload_bbox = 0.0
-            upload_geom = 0.0
-            upload_points = 0.0
-            query_ms = None
-            download_ms = None
-            filter_ms = None
-
+            # Normalize once: {lowercased phase key: duration in ms}. Phases without
+            # duration_ms fall back to duration_us; non-dict entries are skipped.
+            durations = {}
             for key, val in phases.items():
-                nk = key.lower()
-                dur = val.get('duration_ms') if isinstance(val, dict) else None
-                if dur is None:
-                    # try alternate field
-                    dur = val.get('duration_us', 0) / 1000.0 if isinstance(val, dict) else None
-                if dur is None:
+                if not isinstance(val, dict):
                     continue
-
-                # Upload components
-                if 'upload' in nk and 'bbox' in nk:
-                    upload_bbox += float(dur)
-                elif 'upload' in nk and 'geometry' in nk and 'bbox' not in nk:
-                    upload_geom += float(dur)
-                elif 'upload' in nk and 'points' in nk:
-                    upload_points += float(dur)
-
-                # Filter phase (filter_1)
-                if 'filter' in nk:
-                    filter_ms = float(dur)
-
-                # Main query phase (exclude warmup and bbox-related queries)
-                if 'query' in nk and 'warmup' not in nk:
-                    # prefer a plain 'query' phase (may include suffix), but if multiple
-                    # exist, choose the first non-bbox, non-warmup occurrence
-                    if query_ms is None:
-                        query_ms = float(dur)
-
-                # Download / output phases
-                if 'download' in nk or 'output' in nk:
-                    # prefer download results, fallback to output
-                    if download_ms is None:
-                        download_ms = float(dur)
-
-            upload_ms = upload_bbox + upload_geom + upload_points
-
-            # Compute total RaySpace query time if available
-            rayspace_total_ms = None
-
-            # If timing JSON contains the explicit keys we expect, prefer the simple sum
-            # Filter-Refine expected keys (common): 'upload points_1', 'upload query geometry_1', 'query_1', 'download results_1'
-            def _dur(k):
-                v = phases.get(k)
-                if isinstance(v, dict):
-                    return v.get('duration_ms') or (v.get('duration_us', 0) / 1000.0)
-                return None
-
-            explicit_keys = [
-                'upload points_1',
-                'upload query geometry_1',
-                'filter_1',
-                'query_1',
-                'download results_1'
-            ]
-
-            explicit_vals = [(_dur(k) or 0.0) for k in explicit_keys]
-            if any(phases.get(k) is not None for k in explicit_keys):
-                # Use sum of available explicit keys (missing ones are treated as 0)
-                rayspace_total_ms = sum(explicit_vals)
-            else:
-                # Compute total RaySpace query time (upload + filter + query + download) if available
-                # Include filter_1 if available
-                filter_val = filter_ms if filter_ms is not None else 0.0
-                if all(x is not None for x in [upload_ms, query_ms, download_ms]):
-                    rayspace_total_ms = float(upload_ms or 0.0) + float(filter_val) + float(query_ms or 0.0) + float(download_ms or 0.0)
-            
-            # Compute total_query_ms: upload geometry_1 + build index_1 + query_1 + download results_1 + filter_1
-            total_query_ms = None
-            # For filter_refine, geometry upload might be "upload query geometry_1" or "upload geometry_1"
-            upload_geom_dur = _dur('upload query geometry_1') or _dur('upload geometry_1') or 0.0
-            # Build index might be "build query index_1" or "build index_1"
-            build_index_dur = _dur('build query index_1') or _dur('build index_1') or 0.0
-            query_dur = _dur('query_1') or 0.0
-            download_dur = _dur('download results_1') or 0.0
-            # Filter phase is "filter_1"
-            filter_dur = _dur('filter_1') or 0.0
-            
-            total_query_ms = upload_geom_dur + build_index_dur + query_dur + download_dur + filter_dur
-            if total_query_ms == 0.0:
-                total_query_ms = None
-            
-            # Parse stdout
-            inside_count = None
-            total_points = None
+                dur = val.get('duration_ms')
+                if dur is None:
+                    dur = val.get('duration_us', 0) / 1000.0
+                durations[key.lower()] = float(dur)
+
+            pt = PhaseTimings.from_durations(durations)
+
+            # total_query_ms: upload geometry_1 + build index_1 + query_1 + download results_1 + filter_1
+            # (geometry upload and index build may carry a "query" infix in filter_refine)
+            total_query_ms = (
+                (durations.get('upload query geometry_1') or durations.get('upload geometry_1') or 0.0)
+                + (durations.get('build query index_1') or durations.get('build index_1') or 0.0)
+                + durations.get('query_1', 0.0)
+                + durations.get('download results_1', 0.0)
+                + durations.get('filter_1', 0.0)
+            ) or None
             
-            match = re.search(r'Points INSIDE polygons:\s*(\d+)', stdout)
-            if match:
-                inside_count = int(match.group(1))
+            # Result counts: from the timing JSON when the executable writes them there
+            # (as cuda_query does), otherwise parsed from stdout
+            inside_count = timing_data.get('num_inside')
+            total_points = timing_data.get('num_points')
             
-            match = re.search(r'Total points:\s*(\d+)', stdout)
-            if match:
-                total_points = int(match.group(1))
+            if inside_count is None or total_points is None:
+                stdout_inside = stdout_total = None
+                for match in _COUNTS_RE.finditer(stdout):
+                    if match.group('inside') is not None:
+                        if stdout_inside is None:
+                            stdout_inside = int(match.group('inside'))
+                    elif stdout_total is None:
+                        stdout_total = int(match.group('total'))
+                if inside_count is None:
+                    inside_count = stdout_inside
+                if total_points is None:
+                    total_points = stdout_total
             
             return {
-                'query_ms': query_ms,
-                'filter_ms': filter_ms,
-                'upload_ms': upload_ms,
-                'download_ms': download_ms,
+                'query_ms': pt.query,
+                'filter_ms': pt.filter,
+                'upload_ms': pt.upload,
+                'download_ms': pt.download,
                 'total_query_ms': total_query_ms,
                 'inside_count': inside_count,
                 'total_points': total_points,
-                'success': query_ms is not None,
+                'success': pt.query is not None,
                 'timing_data': timing_data
             }
             
@@ -219,15 +217,12 @@ class FilterRefineAdapter(SpatialQueryAdapter):
         except Exception as e:
             return {'success': False, 'error': str(e)}
         finally:
-            # Cleanup
-            import shutil
-            for f in [preprocessed_geom, preprocess_timing, timing_json]:
-                if os.path.exists(f):
-                    os.remove(f)
-            # Remove the mesh directory
-            if os.path.exists(obj_dir):
-                shutil.rmtree(obj_dir)
+            timing_json.unlink(missing_ok=True)
     
     def cleanup(self):
-        """Cleanup workspace."""
-        pass
+        """Remove the per-cell mesh directories and preprocessed geometry."""
+        for obj_dir, preprocessed_geom, preprocess_timing in self._cells.values():
+            shutil.rmtree(obj_dir, ignore_errors=True)
+            preprocessed_geom.unlink(missing_ok=True)
+            preprocess_timing.unlink(missing_ok=True)
+        self._cells.clear()
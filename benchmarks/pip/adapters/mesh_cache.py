@@ -0,0 +1,86 @@
+"""Translated query meshes shared by all adapters in one benchmark process.
+
+A grid cell's mesh is translated once and handed out to every adapter that
+queries that cell. Each get_translated_obj() must be paired with a release();
+the file is deleted when the last holder releases it. Holding a reference
+across a batch of adapters (see grid_benchmark.py) keeps the file alive for
+all of them.
+"""
+
+import hashlib
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from .utils import translate_obj
+
+
+# Cache path -> [reference count, whether this process wrote the file]
+_entries: Dict[str, List] = {}
+
+
+def shared_workspace(workspace_root: str) -> str:
+    """Directory holding the translated meshes of all adapters under workspace_root."""
+    return os.path.join(os.path.abspath(workspace_root), "translated_meshes")
+
+
+def translation_key(translation: np.ndarray) -> Tuple[float, float, float]:
+    """Hashable (x, y, z) of a translation vector, for dict keys and digests."""
+    x, y, z = translation.tolist()
+    return float(x), float(y), float(z)
+
+
+def _cache_path(geometry_path: str, translation: np.ndarray, shared_dir: str) -> str:
+    """Cache file for geometry_path moved by translation.
+
+    Keyed on the source path, its mtime and the exact translation, so an edited
+    source mesh is never served from a stale translation.
+    """
+    digest = hashlib.sha1()
+    digest.update(os.path.abspath(geometry_path).encode())
+    digest.update(repr(os.path.getmtime(geometry_path)).encode())
+    digest.update(repr(translation_key(translation)).encode())
+    return os.path.join(shared_dir, f"{digest.hexdigest()}.obj")
+
+
+def get_translated_obj(geometry_path: str, translation: np.ndarray, shared_dir: str) -> str:
+    """Path of geometry_path translated by translation, translating only on first use."""
+    path = _cache_path(geometry_path, translation, shared_dir)
+    entry = _entries.get(path)
+    if entry is None:
+        entry = _entries[path] = [0, False]
+    if not os.path.exists(path):
+        Path(shared_dir).mkdir(parents=True, exist_ok=True)
+        translate_obj(geometry_path, path, translation)
+        entry[1] = True
+    entry[0] += 1
+    return path
+
+
+def release(path: str):
+    """Drop one reference to a translated mesh; the last one deletes it.
+
+    Files written by another process (e.g. the parent of a worker pool) are left
+    for that process to delete.
+    """
+    entry = _entries.get(path)
+    if entry is None:
+        return
+    entry[0] -= 1
+    if entry[0] <= 0:
+        del _entries[path]
+        if entry[1] and os.path.exists(path):
+            os.remove(path)
+
+
+@contextmanager
+def translated_mesh(geometry_path: str, translation: np.ndarray, shared_dir: str) -> Iterator[str]:
+    """get_translated_obj() for the duration of a with block."""
+    path = get_translated_obj(geometry_path, translation, shared_dir)
+    try:
+        yield path
+    finally:
+        release(path)
@@ -1,26 +1,62 @@
 """RaySpace3D Raytracer adapter."""
 
-import json
-import os
 import re
 import subprocess
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Tuple, Any
+from typing import Dict, Optional, Tuple, Any
 
 import numpy as np
 
 from .base import SpatialQueryAdapter
-from .utils import translate_obj, run_subprocess_streaming
+from .mesh_cache import get_translated_obj, release, translation_key
+from .utils import is_usage_error, link_or_copy, run_subprocess_streaming, load_timing_json
+
+
+# Result count lines printed by the raytracer, matched in a single scan
+_COUNTS_RE = re.compile(r'Points INSIDE polygons:\s*(?P<inside>\d+)|Total rays:\s*(?P<total>\d+)')
+
+
+@lru_cache(maxsize=None)
+def _phase_fields(key: str) -> Tuple[str, ...]:
+    """Timing fields a phase counts towards, from its (case-insensitive) name.
+    
+    Phase names repeat across every query, so each is classified only once.
+    """
+    nk = key.lower()
+    fields = []
+    # Upload parts
+    if 'upload' in nk and 'points' in nk:
+        fields.append('upload_points')
+    elif 'upload' in nk and 'geometry' in nk:
+        fields.append('upload_geom')
+    # Query phase (avoid warmup or bbox labels)
+    if 'query' in nk and 'warmup' not in nk and 'bbox' not in nk:
+        fields.append('query')
+    # Download / output
+    if 'download' in nk or 'output' in nk:
+        fields.append('download')
+    return tuple(fields)
 
 
 class RaytracerAdapter(SpatialQueryAdapter):
     """Adapter for RaySpace3D raytracer."""
     
-    def __init__(self, workspace: str, rayspace_dir: str):
+    def __init__(self, workspace: str, rayspace_dir: str, translate_arg: bool = False):
         super().__init__("Raytracer", workspace)
         self.rayspace_dir = Path(rayspace_dir)
         self.executable = self.rayspace_dir / "build" / "bin" / "raytracer"
         self.preprocess_exec = self.rayspace_dir / "build" / "bin" / "preprocess_dataset"
+        # Pass the cell translation as --translate x y z instead of writing a
+        # translated mesh; switched off if the raytracer rejects the flag
+        self.translate_arg = translate_arg
+        self._translate_ok = False
+        # Preprocessed geometry per distinct input mesh, reused across grid cells
+        self._geom_cache: Dict[Tuple, Path] = {}
+    
+    @property
+    def uses_translated_mesh(self) -> bool:
+        return not self.translate_arg
     
     def setup(self, **kwargs) -> bool:
         """Check raytracer executable exists."""
@@ -44,46 +80,87 @@ class RaytracerAdapter(SpatialQueryAdapter):
         **kwargs
     ) -> Dict[str, Any]:
         """Execute raytracer query."""
+        result = self._query(geometry_path, points_path, grid_pos, translation)
+        if result is None:
+            # --translate was rejected: run this cell again with a translated mesh
+            result = self._query(geometry_path, points_path, grid_pos, translation)
+        return result
+    
+    def _query(
+        self,
+        geometry_path: str,
+        points_path: str,
+        grid_pos: Tuple[int, int, int],
+        translation: np.ndarray
+    ) -> Optional[Dict[str, Any]]:
+        """One raytracer run; None means this build rejected --translate."""
+        self._ensure_workspace()
         gx, gy, gz = grid_pos
         
-        # Translate OBJ and place in its own subdirectory (required by preprocess_dataset)
-        obj_dir = os.path.join(self.workspace, f"mesh_{gx}_{gy}_{gz}")
-        os.makedirs(obj_dir, exist_ok=True)
-        translated_obj = os.path.join(obj_dir, "mesh.obj")
-        translate_obj(geometry_path, translated_obj, translation)
-        
-        # Preprocess to get geometry file
-        preprocessed_geom = os.path.join(self.workspace, f"geom_{gx}_{gy}_{gz}.txt")
-        preprocess_timing = os.path.join(self.workspace, f"preprocess_timing_{gx}_{gy}_{gz}.json")
+        # Preprocessed geometry depends only on the mesh preprocess_dataset reads:
+        # the original (unchanged since its mtime/size) when the raytracer
+        # translates, else the translated copy, whose cache path already encodes
+        # source and translation
+        translate_arg = self.translate_arg
+        if translate_arg:
+            source_obj = Path(geometry_path).resolve()
+            st = source_obj.stat()
+            mesh_key = (str(source_obj), st.st_mtime_ns, st.st_size)
+        else:
+            source_obj = get_translated_obj(geometry_path, translation, self.mesh_cache_dir)
+            mesh_key = (source_obj,)
         
-        cmd_preprocess = [
-            str(self.preprocess_exec),
-            "--mode", "mesh",
-            "--dataset", obj_dir,
-            "--output-geometry", preprocessed_geom,
-            "--output-timing", preprocess_timing
-        ]
-        
-        try:
-            run_subprocess_streaming(
-                cmd_preprocess,
-                prefix="[Raytracer]",
-                timeout=600,
-                check=True
-            )
-        except Exception as e:
-            return {'success': False, 'error': f'Preprocessing failed: {str(e)}'}
+        preprocessed_geom = self._geom_cache.get(mesh_key)
+        if preprocessed_geom is None:
+            # Place the OBJ in its own subdirectory (required by preprocess_dataset)
+            obj_dir = self._ws / f"mesh_{gx}_{gy}_{gz}"
+            obj_dir.mkdir(exist_ok=True)
+            translated_obj = obj_dir / "mesh.obj"
+            if translate_arg:
+                translated_obj.unlink(missing_ok=True)
+                translated_obj.symlink_to(source_obj)
+            else:
+                link_or_copy(source_obj, translated_obj)
+                release(source_obj)
+            
+            # Preprocess to get geometry file
+            preprocessed_geom = self._ws / f"geom_{gx}_{gy}_{gz}.txt"
+            preprocess_timing = self._ws / f"preprocess_timing_{gx}_{gy}_{gz}.json"
+            
+            cmd_preprocess = [
+                str(self.preprocess_exec),
+                "--mode", "mesh",
+                "--dataset", str(obj_dir),
+                "--output-geometry", str(preprocessed_geom),
+                "--output-timing", str(preprocess_timing)
+            ]
+            
+            try:
+                run_subprocess_streaming(
+                    cmd_preprocess,
+                    prefix="[Raytracer]",
+                    timeout=600,
+                    check=True,
+                    capture_stdout=False
+                )
+            except Exception as e:
+                return {'success': False, 'error': f'Preprocessing failed: {str(e)}'}
+            self._geom_cache[mesh_key] = preprocessed_geom
+        elif not translate_arg:
+            release(source_obj)
         
         # Run raytracer
-        timing_json = os.path.join(self.workspace, f"timing_{gx}_{gy}_{gz}.json")
+        timing_json = self._ws / f"timing_{gx}_{gy}_{gz}.json"
         
         cmd_raytrace = [
             str(self.executable),
-            "--geometry", preprocessed_geom,
+            "--geometry", str(preprocessed_geom),
             "--points", points_path,
-            "--output", timing_json,
+            "--output", str(timing_json),
             "--no-export"
         ]
+        if translate_arg:
+            cmd_raytrace += ["--translate", *map(repr, translation_key(translation))]
         
         try:
             result, stdout, stderr = run_subprocess_streaming(
@@ -92,46 +169,36 @@ class RaytracerAdapter(SpatialQueryAdapter):
                 timeout=3600,
                 check=True
             )
+            self._translate_ok = self._translate_ok or translate_arg
             
             # Read timing JSON
-            with open(timing_json, 'r') as f:
-                timing_data = json.load(f)
+            timing_data = load_timing_json(timing_json)
             
             # Extract relevant timings robustly (keys may vary/case and include suffixes)
             phases = timing_data.get('phases', {})
 
-            upload_points = 0.0
-            upload_geom = 0.0
-            query_ms = None
-            download_ms = None
+            # Uploads are summed per kind; query and download take the first match
+            uploads = {'upload_points': 0.0, 'upload_geom': 0.0}
+            firsts = {}
 
             for key, val in phases.items():
-                nk = key.lower()
-                dur = None
-                if isinstance(val, dict):
-                    dur = val.get('duration_ms')
-                    if dur is None and 'duration_us' in val:
-                        dur = val.get('duration_us', 0) / 1000.0
+                fields = _phase_fields(key)
+                if not fields or not isinstance(val, dict):
+                    continue
+                dur = val.get('duration_ms')
+                if dur is None and 'duration_us' in val:
+                    dur = val.get('duration_us', 0) / 1000.0
                 if dur is None:
                     continue
+                for field in fields:
+                    if field in uploads:
+                        uploads[field] += float(dur)
+                    else:
+                        firsts.setdefault(field, float(dur))
 
-                # Upload parts
-                if 'upload' in nk and 'points' in nk:
-                    upload_points += float(dur)
-                elif 'upload' in nk and 'geometry' in nk:
-                    upload_geom += float(dur)
-
-                # Query phase (avoid warmup or bbox labels)
-                if 'query' in nk and 'warmup' not in nk and 'bbox' not in nk:
-                    if query_ms is None:
-                        query_ms = float(dur)
-
-                # Download / output
-                if 'download' in nk or 'output' in nk:
-                    if download_ms is None:
-                        download_ms = float(dur)
-
-            upload_ms = upload_points + upload_geom
+            query_ms = firsts.get('query')
+            download_ms = firsts.get('download')
+            upload_ms = uploads['upload_points'] + uploads['upload_geom']
 
             # If timing JSON contains the explicit keys we expect, prefer the simple sum
             # Raytracer expected keys: 'upload points_1', 'upload query geometry_1' or 'upload geometry_1', 'query_1', 'download results_1'
@@ -175,17 +242,23 @@ class RaytracerAdapter(SpatialQueryAdapter):
             if total_query_ms == 0.0:
                 total_query_ms = None
             
-            # Parse stdout for results
-            inside_count = None
-            total_points = None
-            
-            match = re.search(r'Points INSIDE polygons:\s*(\d+)', stdout)
-            if match:
-                inside_count = int(match.group(1))
+            # Result counts: from the timing JSON when the executable writes them there
+            # (as cuda_query does), otherwise parsed from stdout
+            inside_count = timing_data.get('num_inside')
+            total_points = timing_data.get('num_points')
             
-            match = re.search(r'Total rays:\s*(\d+)', stdout)
-            if match:
-                total_points = int(match.group(1))
+            if inside_count is None or total_points is None:
+                stdout_inside = stdout_total = None
+                for match in _COUNTS_RE.finditer(stdout):
+                    if match.group('inside') is not None:
+                        if stdout_inside is None:
+                            stdout_inside = int(match.group('inside'))
+                    elif stdout_total is None:
+                        stdout_total = int(match.group('total'))
+                if inside_count is None:
+                    inside_count = stdout_inside
+                if total_points is None:
+                    total_points = stdout_total
             
             return {
                 'query_ms': query_ms,
@@ -202,6 +275,14 @@ class RaytracerAdapter(SpatialQueryAdapter):
         except subprocess.TimeoutExpired:
             return {'success': False, 'error': 'Timeout'}
         except subprocess.CalledProcessError as e:
+            if translate_arg and not self._translate_ok and is_usage_error(e.output):
+                # The first --translate run was rejected on the command line: no such flag
+                print(f"[Raytracer] {self.executable.name} does not accept --translate; "
+                      f"writing translated meshes instead")
+                self.translate_arg = False
+                # Its geometry file is about to be overwritten with the translated mesh's
+                self._geom_cache.clear()
+                return None
             return {'success': False, 'error': stderr if 'stderr' in locals() else str(e)}
         except Exception as e:
             return {'success': False, 'error': str(e)}
@@ -1,21 +1,29 @@
 """PostgreSQL/PostGIS baseline adapter."""
 
-import os
 import re
 import subprocess
 from pathlib import Path
-from typing import Dict, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any
 
 import numpy as np
 
 from .base import SpatialQueryAdapter
-from .utils import translate_obj, wkt_points_to_csv, run_subprocess_streaming
+from .mesh_cache import get_translated_obj, release, translation_key
+from .utils import conda_env, is_usage_error, wkt_points_to_csv, run_subprocess_streaming
+
+
+# Result lines printed by the SQL query script, matched in a single scan over its stdout
+_SQL_RE = re.compile(
+    r'QUERY TIME:\s*(?P<time>[0-9.]+)\s*ms'
+    r'|Points inside mesh:\s*(?P<inside>\d+)'
+    r'|Total points:\s*(?P<total>\d+)'
+)
 
 
 class SQLAdapter(SpatialQueryAdapter):
     """Adapter for PostgreSQL/PostGIS baseline."""
     
-    def __init__(self, workspace: str, sql_basedir: str, db_name: str = "spatial3d"):
+    def __init__(self, workspace: str, sql_basedir: str, db_name: str = "spatial3d", translate_arg: bool = False):
         super().__init__("SQL", workspace)
         # Resolve the SQL base directory to an absolute path to avoid
         # relative-path confusion when running subprocesses that `cd`.
@@ -23,6 +31,27 @@ class SQLAdapter(SpatialQueryAdapter):
         self.executable = self.sql_basedir / "build" / "spatial_query"
         self.db_name = db_name
         self.points_loaded = False
+        # Pass the cell translation as --translate x y z instead of writing a
+        # translated mesh; switched off if spatial_query rejects the flag
+        self.translate_arg = translate_arg
+        self._translate_ok = False
+        # Environment of the activated spatial3d conda env, captured in setup()
+        self._env = None
+    
+    @property
+    def uses_translated_mesh(self) -> bool:
+        return not self.translate_arg
+    
+    def _command(self, *args: str) -> List[str]:
+        """spatial_query invocation: exec'd directly in the environment captured by
+        setup(), or through a shell that activates spatial3d first."""
+        if self._env is not None:
+            return [str(self.executable), *args]
+        return ["bash", "-c", f"""
+source $(conda info --base)/etc/profile.d/conda.sh
+conda activate spatial3d
+{self.executable} {' '.join(args)}
+"""]
     
     def setup(self, points_path: str, **kwargs) -> bool:
         """Build SQL executable and load points once."""
@@ -54,6 +83,8 @@ class SQLAdapter(SpatialQueryAdapter):
         if not self.executable.exists():
             return False
         
+        self._env = conda_env("spatial3d", prefix="[SQL]")
+        
         # Initialize database if needed
         print(f"[SQL] Checking database...")
         # Run the initialization script from within the SQL base dir. Use
@@ -79,20 +110,17 @@ class SQLAdapter(SpatialQueryAdapter):
         # Load points once (reuse database)
         if not self.points_loaded:
             print(f"[SQL] Loading points to database (one-time per benchmark)...")
-            csv_file = os.path.join(self.workspace, "points.csv")
+            self._ensure_workspace()
+            csv_file = str(self._ws / "points.csv")
             wkt_points_to_csv(points_path, csv_file)
             
-            cmd = f"""
-source $(conda info --base)/etc/profile.d/conda.sh
-conda activate spatial3d
-{self.executable} load_points {csv_file}
-"""
             try:
                 result, stdout, stderr = run_subprocess_streaming(
-                    ["bash", "-c", cmd],
+                    self._command("load_points", csv_file),
                     prefix="[SQL]",
                     timeout=3600,
-                    check=True
+                    check=True,
+                    env=self._env
                 )
                 print(f"[SQL] Points loaded successfully")
                 self.points_loaded = True
@@ -111,46 +139,52 @@ conda activate spatial3d
         **kwargs
     ) -> Dict[str, Any]:
         """Execute SQL query."""
-        # Translate geometry
-        gx, gy, gz = grid_pos
-        translated_obj = os.path.join(self.workspace, f"translated_{gx}_{gy}_{gz}.obj")
-        translate_obj(geometry_path, translated_obj, translation)
+        result = self._query(geometry_path, translation)
+        if result is None:
+            # --translate was rejected: run this cell again with a translated mesh
+            result = self._query(geometry_path, translation)
+        return result
+    
+    def _query(self, geometry_path: str, translation: np.ndarray) -> Optional[Dict[str, Any]]:
+        """One spatial_query run; None means this build rejected --translate."""
+        self._ensure_workspace()
+        translate_arg = self.translate_arg
+        if translate_arg:
+            # spatial_query applies the translation itself
+            translated_obj = None
+            tx, ty, tz = translation_key(translation)
+            query_args = [str(Path(geometry_path).resolve()), "--translate", repr(tx), repr(ty), repr(tz)]
+        else:
+            # Translate geometry (shared, cached translation)
+            translated_obj = get_translated_obj(geometry_path, translation, self.mesh_cache_dir)
+            query_args = [translated_obj]
         
         # Run SQL query
-        cmd = f"""
-source $(conda info --base)/etc/profile.d/conda.sh
-conda activate spatial3d
-{self.executable} query {translated_obj}
-"""
-        
         try:
             result, stdout, stderr = run_subprocess_streaming(
-                ["bash", "-c", cmd],
+                self._command("query", *query_args),
                 prefix="[SQL]",
                 timeout=3600,
-                check=True
+                check=True,
+                env=self._env
             )
+            self._translate_ok = self._translate_ok or translate_arg
             
-            # Parse stdout for timing and results
+            # Parse stdout for timing and results (first occurrence of each wins)
             
             query_time_ms = None
             inside_count = None
             total_points = None
             
-            # Look for "QUERY TIME: XXX ms"
-            match = re.search(r'QUERY TIME:\s*([0-9.]+)\s*ms', stdout)
-            if match:
-                query_time_ms = float(match.group(1))
-            
-            # Look for "Points inside mesh: XXX"
-            match = re.search(r'Points inside mesh:\s*(\d+)', stdout)
-            if match:
-                inside_count = int(match.group(1))
-            
-            # Look for "Total points: XXX"
-            match = re.search(r'Total points:\s*(\d+)', stdout)
-            if match:
-                total_points = int(match.group(1))
+            for match in _SQL_RE.finditer(stdout):
+                if match.group('time') is not None:
+                    if query_time_ms is None:
+                        query_time_ms = float(match.group('time'))
+                elif match.group('inside') is not None:
+                    if inside_count is None:
+                        inside_count = int(match.group('inside'))
+                elif total_points is None:
+                    total_points = int(match.group('total'))
             
             return {
                 'query_ms': query_time_ms,
@@ -164,13 +198,18 @@ conda activate spatial3d
         except subprocess.TimeoutExpired:
             return {'success': False, 'error': 'Timeout'}
         except subprocess.CalledProcessError as e:
+            if translate_arg and not self._translate_ok and is_usage_error(e.output):
+                # The first --translate run was rejected on the command line: no such flag
+                print(f"[SQL] {self.executable.name} does not accept --translate; "
+                      f"writing translated meshes instead")
+                self.translate_arg = False
+                return None
             return {'success': False, 'error': stderr if 'stderr' in locals() else str(e)}
         except Exception as e:
             return {'success': False, 'error': str(e)}
         finally:
-            # Cleanup translated file
-            if os.path.exists(translated_obj):
-                os.remove(translated_obj)
+            if translated_obj is not None:
+                release(translated_obj)
     
     def cleanup(self):
         """Cleanup workspace."""
@@ -19,6 +19,8 @@ import re
 import sys
 import time
 import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, nullcontext
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any
@@ -35,6 +37,7 @@ from adapters import (
     FilterRefineAdapter,
     CUDAAdapter
 )
+from adapters.mesh_cache import shared_workspace, translated_mesh
 from adapters.utils import run_subprocess_streaming, compute_obj_bbox
 
 
@@ -127,6 +130,21 @@ def generate_centered_positions(
     ]
 
 
+# ============================================================================
+# Query Execution
+# ============================================================================
+
+def timed_query(adapter, query_obj: str, points: str, grid_pos: Tuple[int, int, int],
+                translation: np.ndarray) -> Tuple[Dict[str, Any], float]:
+    """Run one adapter query; returns (result, wall time in seconds).
+    
+    Module-level so it can be shipped to ProcessPoolExecutor workers.
+    """
+    start_time = time.time()
+    result = adapter.execute_query(query_obj, points, grid_pos, translation)
+    return result, time.time() - start_time
+
+
 # ============================================================================
 # Visualization
 # ============================================================================
@@ -316,6 +334,12 @@ def main():
                         help='Timing metric for evaluation (default: total_query_ms)')
     parser.add_argument('--name', type=str, default=None,
                         help='Optional benchmark name to include in output filename')
+    parser.add_argument('--parallel-cells', type=int, default=1,
+                        help='Grid cells to query concurrently for CPU-only approaches (cgal); '
+                             'GPU and database approaches always run one cell at a time (default: 1)')
+    parser.add_argument('--translate-arg', action='store_true',
+                        help='Pass each cell translation to the raytracer and SQL executables as '
+                             '--translate x y z instead of writing a translated mesh per cell')
     
     args = parser.parse_args()
     
@@ -439,13 +463,15 @@ fi
     if 'sql' in approaches_list:
         adapters['SQL'] = SQLAdapter(
             os.path.join(args.workspace, 'sql'),
-            args.sql_dir
+            args.sql_dir,
+            translate_arg=args.translate_arg
         )
     
     if 'raytracer' in approaches_list:
         adapters['Raytracer'] = RaytracerAdapter(
             os.path.join(args.workspace, 'raytracer'),
-            args.rayspace_dir
+            args.rayspace_dir,
+            translate_arg=args.translate_arg
         )
     
     if 'raytracer_filter_refine' in approaches_list:
@@ -494,6 +520,29 @@ fi
     print("="*70)
     
     all_results = {name: [] for name in adapters.keys()}
+    mesh_dir = shared_workspace(args.workspace)
+    
+    # Approaches that can run grid cells concurrently do so up front, before the serial
+    # approaches start, so they never compete with them for the CPU
+    parallel_results = {}
+    parallel_names = [name for name, adapter in adapters.items()
+                      if args.parallel_cells > 1 and adapter.supports_parallel]
+    if parallel_names:
+        # Translate every cell here and hold the files for the whole pool run; workers
+        # reuse them and leave deletion to this process
+        with ExitStack() as held_meshes, ProcessPoolExecutor(max_workers=args.parallel_cells) as executor:
+            for _, _, _, translation in grid_positions:
+                held_meshes.enter_context(translated_mesh(args.query_obj, translation, mesh_dir))
+            for name in parallel_names:
+                print(f"\n  [{name}] Running {len(grid_positions)} queries, {args.parallel_cells} at a time...")
+                parallel_results[name] = list(executor.map(
+                    timed_query,
+                    [adapters[name]] * len(grid_positions),
+                    [args.query_obj] * len(grid_positions),
+                    [args.points] * len(grid_positions),
+                    [(gx, gy, gz) for gx, gy, gz, _ in grid_positions],
+                    [translation for _, _, _, translation in grid_positions],
+                ))
     
     for idx, (gx, gy, gz, translation) in enumerate(grid_positions, 1):
         if args.centered:
@@ -502,33 +551,38 @@ fi
             print(f"\n--- Grid Position {idx}/{len(grid_positions)}: ({gx}, {gy}, {gz}) ---")
         print(f"    Translation: {translation}")
         
-        for name, adapter in adapters.items():
-            print(f"  [{name}] Running query...")
-            start_time = time.time()
-            
-            result = adapter.execute_query(
-                args.query_obj,
-                args.points,
-                (gx, gy, gz),
-                translation
-            )
-            
-            elapsed = time.time() - start_time
-            
-            result['grid_position'] = [gx, gy, gz]
-            result['translation'] = translation.tolist()
-            result['wall_time_s'] = elapsed
-            
-            # Check that total_query_ms is set by the adapter
-            if result.get('success'):
-                if 'total_query_ms' not in result or result.get('total_query_ms') is None:
-                    print(f"  [{name}] ERROR: total_query_ms not set by adapter!")
+        # One translated mesh per grid cell, shared by every adapter below that
+        # still reads one (not needed when all of them take --translate)
+        needs_mesh = any(adapter.uses_translated_mesh for name, adapter in adapters.items()
+                         if name not in parallel_results)
+        with translated_mesh(args.query_obj, translation, mesh_dir) if needs_mesh else nullcontext():
+            for name, adapter in adapters.items():
+                if name in parallel_results:
+                    result, elapsed = parallel_results[name][idx - 1]
                 else:
-                    print(f"  [{name}] Success! Query time: {result.get('total_query_ms', 'N/A')} ms")
-            else:
-                print(f"  [{name}] Failed: {result.get('error', 'Unknown error')}")
-            
-            all_results[name].append(result)
+                    print(f"  [{name}] Running query...")
+                    result, elapsed = timed_query(
+                        adapter,
+                        args.query_obj,
+                        args.points,
+                        (gx, gy, gz),
+                        translation
+                    )
+                
+                result['grid_position'] = [gx, gy, gz]
+                result['translation'] = translation.tolist()
+                result['wall_time_s'] = elapsed
+                
+                # Check that total_query_ms is set by the adapter
+                if result.get('success'):
+                    if 'total_query_ms' not in result or result.get('total_query_ms') is None:
+                        print(f"  [{name}] ERROR: total_query_ms not set by adapter!")
+                    else:
+                        print(f"  [{name}] Success! Query time: {result.get('total_query_ms', 'N/A')} ms")
+                else:
+                    print(f"  [{name}] Failed: {result.get('error', 'Unknown error')}")
+                
+                all_results[name].append(result)
     
     # Cleanup
     print("\n" + "="*70)